@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# Compare the combinator pipeline with the jinja2 template backend by
+# rendering every file of a model a number of times.
+#
+#   python3 benchmarks/backends.py [--model FILE] [--repeat N]
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from kxgen.loader import load_model  # noqa: E402
+from kxgen.render import BACKENDS, render, render_cache  # noqa: E402
+
+
+def tasks(configs):
+    for config in configs:
+        for obj in config['data']:
+            for ns, ent in obj.entities():
+                for suffix in ('_fwd.hpp', '.hpp', '.cpp'):
+                    yield ns, ent, suffix
+
+
+def bench(backend, work, repeat):
+    render(*work[0], backend)  # load and compile templates outside the timing
+    start = time.perf_counter()
+    size = 0
+    for _ in range(repeat):
+        render_cache.clear()
+        for ns, ent, suffix in work:
+            size += len(render(ns, ent, suffix, backend))
+    return time.perf_counter() - start, size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', metavar='FILE')
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    if args.model:
+        configs = load_model(args.model)
+    else:
+        from kxgen.configs import configs
+    work = list(tasks(configs))
+
+    print(f"{ len(work) } files x { args.repeat }")
+    for backend in BACKENDS:
+        elapsed, size = bench(backend, work, args.repeat)
+        files = len(work) * args.repeat
+        print(f"{ backend:12} { elapsed:8.3f} s { files / elapsed:10.0f} files/s { size / elapsed / 1e6:8.2f} MB/s")
+
+
+if __name__ == '__main__':
+    main()
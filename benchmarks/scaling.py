@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# Time (and optionally peak memory of) each generator stage on synthetic
+# models of increasing size.
+#
+#   python3 benchmarks/scaling.py [--sizes 10,1000,100000] [--memory]
+
+import argparse
+import gc
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic  # noqa: E402
+from kxgen.output import Emitter  # noqa: E402
+from kxgen.render import render, render_cache  # noqa: E402
+
+
+SUFFIXES = ('_fwd.hpp', '.hpp', '.cpp')
+
+
+def measure(fn, memory):
+    gc.collect()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    peak = None
+    if memory:
+        # A second, traced run: tracemalloc slows allocation down too much
+        # to share a run with the timing.
+        result = None
+        gc.collect()
+        render_cache.clear()
+        tracemalloc.start()
+        result = fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def stages(size, args):
+    build = lambda: synthetic.build(
+        size,
+        namespaces=args.namespaces,
+        methods=args.methods,
+        args=args.args,
+        members=args.members,
+    )
+    configs, elapsed, peak = measure(build, args.memory)
+    yield 'build', elapsed, peak
+
+    ents = list(synthetic.entities(configs))
+    for suffix in SUFFIXES:
+        def render_suffix():
+            render_cache.clear()
+            return sum(len(render(ns, ent, suffix)) for ns, ent in ents)
+        _, elapsed, peak = measure(render_suffix, args.memory)
+        yield f'render { suffix }', elapsed, peak
+
+    if args.output:
+        def output():
+            base = tempfile.mkdtemp(prefix='kxgen-bench-')
+            try:
+                emitter = Emitter()
+                for config in configs:
+                    for obj in config['data']:
+                        obj.gen(inc_dir=os.path.join(base, 'include'),
+                                src_dir=os.path.join(base, 'src'),
+                                emitter=emitter)
+                emitter.close()
+            finally:
+                shutil.rmtree(base)
+        _, elapsed, peak = measure(output, args.memory)
+        yield 'output', elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='10,1000,100000',
+                        help="comma separated class counts")
+    parser.add_argument('--namespaces', type=int,
+                        help="namespaces per model (default: one per 100 classes)")
+    parser.add_argument('--methods', type=int, default=4)
+    parser.add_argument('--args', type=int, default=2)
+    parser.add_argument('--members', type=int, default=2)
+    parser.add_argument('--no-output', dest='output', action='store_false',
+                        help="skip writing files to a temporary directory")
+    parser.add_argument('--memory', action='store_true',
+                        help="also report peak traced memory per stage")
+    args = parser.parse_args()
+
+    print(f"{ 'classes':>8} { 'stage':16} { 'seconds':>9} { 'us/class':>10} { 'peak MB':>9}")
+    for size in (int(s) for s in args.sizes.split(',')):
+        for stage, elapsed, peak in stages(size, args):
+            mem = f"{ peak / 1e6:9.1f}" if peak is not None else f"{ '-':>9}"
+            print(f"{ size:8} { stage:16} { elapsed:9.3f} { elapsed / size * 1e6:10.1f} { mem }")
+
+
+if __name__ == '__main__':
+    main()
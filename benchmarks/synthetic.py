@@ -0,0 +1,73 @@
+# Synthetic models of configurable size for benchmarking the generator.
+#
+# Every class gets methods taking the shared kx::core::Time and a
+# kx::rend::Renderer pointer, plus a value and a pointer to a sibling class,
+# so the model exercises both hard and forward dependencies.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from kxgen.model import (  # noqa: E402
+    Arg, Class, Constructor, Destructor, Function, Method, Module, Namespace,
+    Pointer, Primitive, Type, TypeDef, void,
+)
+
+
+def core():
+    return Namespace('kx', [
+        Namespace('core', [
+            Module('time',
+                TypeDef(Primitive('int'), 'Time'),
+                Function('get_time', Primitive('Time')),
+            ),
+        ]),
+        Namespace('rend', [
+            Class('Renderer', methods=[Constructor(), Destructor()]),
+        ]),
+    ])
+
+
+def build(classes, *, namespaces=None, methods=4, args=2, members=2):
+    if namespaces is None:
+        namespaces = max(1, classes // 100)
+    per_ns = -(-classes // namespaces)
+
+    time = Type('kx', 'core', 'Time')
+    renderer = Pointer('kx', 'rend', 'Renderer')
+    nss = []
+    n = 0
+    for i in range(namespaces):
+        ns = ('gen', f'ns{ i }')
+        objs = []
+        for j in range(min(per_ns, classes - n)):
+            sibling = Type(*ns, f'Class{ (j + 1) % per_ns }')
+            arg_types = [time, renderer, Pointer(sibling), Primitive('int'), sibling]
+            fns = [Constructor(), Destructor()]
+            for k in range(methods):
+                fns.append(Method(
+                    f'method{ k }',
+                    [void, time, Pointer(sibling), Primitive('int')][k % 4],
+                    [Arg(arg_types[(k + a) % len(arg_types)], f'arg{ a }') for a in range(args)],
+                    virtual=k % 2 == 0,
+                    const=k % 3 == 0,
+                ))
+            objs.append(Class(
+                f'Class{ j }',
+                methods=fns,
+                members=[Arg(arg_types[m % len(arg_types)], f'member{ m }') for m in range(members)],
+            ))
+            n += 1
+        nss.append(Namespace(ns[1], objs))
+
+    return [
+        {'data': [core()], 'include_dir': 'include', 'source_dir': 'src'},
+        {'data': [Namespace('gen', nss)], 'include_dir': 'include', 'source_dir': 'src'},
+    ]
+
+
+def entities(configs):
+    for config in configs:
+        for obj in config['data']:
+            yield from obj.entities()
@@ -0,0 +1,4 @@
+from .model import (
+    Arg, Class, Constructor, Destructor, Function, Method, Module, Namespace,
+    Pointer, Primitive, Std, Type, TypeDef, void,
+)
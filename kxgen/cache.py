@@ -0,0 +1,93 @@
+import os
+import time
+
+from .instrument import log, stats
+from .output import replace_file
+
+
+class OutputCache:
+    # Content-addressed store of rendered files in a directory that several
+    # checkouts and CI workers can share. Entries are named by fingerprint(),
+    # which covers the entity, its resolved dependencies and the generator
+    # version, and are written atomically and never changed, so sharing needs
+    # no locking. Reading an entry marks it used; once the directory holds
+    # more than limit bytes, the least recently used entries are evicted.
+    def __init__(self, path, limit=256 << 20):
+        self.path = path
+        self.limit = limit
+        self.started = time.time()
+        self.dirs = set()
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.evicted = 0
+
+    def entry(self, key):
+        return os.path.join(self.path, key[:2], key[2:])
+
+    def get(self, key):
+        path = self.entry(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read().decode()
+                used = os.fstat(f.fileno()).st_mtime
+        except FileNotFoundError:
+            self.misses += 1
+            stats.count('cache misses')
+            return None
+        self.hits += 1
+        stats.count('cache hits')
+        if used < self.started:
+            # Once per run is enough to order entries by use.
+            try:
+                os.utime(path)
+            except OSError:
+                # Evicted meanwhile by someone else.
+                pass
+        return data
+
+    def put(self, key, data):
+        path = self.entry(key)
+        dirname = os.path.dirname(path)
+        if dirname not in self.dirs:
+            os.makedirs(dirname, exist_ok=True)
+            self.dirs.add(dirname)
+        replace_file(path, data, self.dirs)
+        self.stored += 1
+
+    def prune(self):
+        entries = []
+        total = 0
+        for d in os.scandir(self.path):
+            if not d.is_dir():
+                continue
+            for e in os.scandir(d.path):
+                if e.name.startswith('.'):
+                    # Another process's write in progress.
+                    continue
+                try:
+                    st = e.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, e.path, st.st_size))
+                total += st.st_size
+        entries.sort()
+        for used, path, size in entries:
+            if total <= self.limit:
+                break
+            try:
+                os.unlink(path)
+                self.evicted += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        stats.count('cache evictions', self.evicted)
+
+    def close(self):
+        # Only new entries can push the cache over its limit. --watch closes
+        # the cache after every update, so the counters are per update.
+        if self.stored:
+            self.prune()
+        log.info("output cache: %d hits, %d misses, %d stored, %d evicted",
+                 self.hits, self.misses, self.stored, self.evicted)
+        self.hits = self.misses = self.stored = self.evicted = 0
@@ -0,0 +1,93 @@
+import difflib
+import os
+
+from .instrument import stats
+from .output import ConcurrentWriter
+
+
+CHUNK = 1 << 16
+
+
+def compare(filename, data):
+    # None if the file holds exactly data, else 'changed' or 'added'. Files
+    # are read in chunks, and only as far as they match.
+    new = memoryview(data.encode())
+    try:
+        f = open(filename, 'rb')
+    except FileNotFoundError:
+        return 'added'
+    with f:
+        if os.fstat(f.fileno()).st_size != len(new):
+            return 'changed'
+        for i in range(0, len(new), CHUNK):
+            if f.read(CHUNK) != new[i:i + CHUNK]:
+                return 'changed'
+    return None
+
+
+def read(filename):
+    with open(filename, 'rb') as f:
+        return f.read().decode(errors='replace')
+
+
+def unified_diff(filename, old, new, status):
+    lines = difflib.unified_diff(
+        old.splitlines(keepends=True),
+        new.splitlines(keepends=True),
+        '/dev/null' if status == 'added' else f"a/{ filename }",
+        '/dev/null' if status == 'stale' else f"b/{ filename }",
+    )
+    return ''.join(line if line.endswith('\n') else line + '\n' for line in lines)
+
+
+class CheckWriter(ConcurrentWriter):
+    # Compares output with the files on disk instead of writing anything,
+    # from jobs threads. Results are reported in generation order.
+    def __init__(self, jobs, diff=False):
+        super().__init__(jobs)
+        self.diff = diff
+        self.generated = []
+        # filename -> (status, unified diff or None), for files that differ.
+        self.results = {}
+
+    def make_dir(self, path):
+        pass
+
+    def write(self, filename, data):
+        self.generated.append(filename)
+        super().write(filename, data)
+
+    def write_one(self, filename, data):
+        status = compare(filename, data)
+        stats.count('files checked')
+        if status is not None:
+            old = read(filename) if self.diff and status == 'changed' else ''
+            diff = unified_diff(filename, old, data, status) if self.diff else None
+            self.results[filename] = (status, diff)
+
+
+def stale_files(manifest, generated, roots):
+    # Files an earlier run generated, per its manifest, that this run did
+    # not; other files in the output directories may be hand-written.
+    generated = {os.path.normpath(f) for f in generated}
+    roots = tuple(os.path.join(os.path.normpath(r), '') for r in roots)
+    return sorted(
+        f for f in manifest.entries
+        if os.path.normpath(f) not in generated
+        and os.path.normpath(f).startswith(roots)
+        and os.path.exists(f)
+    )
+
+
+def report(writer, stale, stream):
+    # Prints what a run would change; returns the number of files by status.
+    counts = {'changed': 0, 'added': 0, 'stale': 0}
+    entries = [(f, *writer.results[f]) for f in writer.generated if f in writer.results]
+    for f in stale:
+        entries.append((f, 'stale', unified_diff(f, read(f), '', 'stale') if writer.diff else None))
+    for filename, status, diff in entries:
+        counts[status] += 1
+        stream.write(f"{ status:8} { filename }\n")
+        if diff:
+            stream.write(diff)
+    return counts
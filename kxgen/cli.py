@@ -0,0 +1,236 @@
+import argparse
+import gc
+import logging
+import os
+import sys
+
+from .cache import OutputCache
+from .check import CheckWriter, report as check_report, stale_files
+from .devirt import devirtualize
+from .graph import DepGraph
+from .includes import fan_out, minimize_includes, report
+from .layout import LayoutPlanner, report as layout_report
+from .instrument import stats
+from .loader import ModelError, load_model
+from .meson import MesonEmitter
+from .output import (
+    ConcurrentWriter, Emitter, FileWriter, IncrementalEmitter, Manifest, OverwriteError,
+    ParallelEmitter, SelectiveEmitter, StdoutWriter,
+)
+from .profile import PROFILES, apply_profile
+from .render import BACKENDS
+from .validate import validate
+from .watch import Watcher
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='kxgen', description="Generate kx headers and sources.")
+    parser.add_argument('--stdout', action='store_true',
+                        help="dump generated files to stdout instead of writing them")
+    parser.add_argument('--backend', choices=BACKENDS, default='combinators',
+                        help="how files are rendered (default: %(default)s)")
+    parser.add_argument('--profile', choices=PROFILES, default='debug',
+                        help="debug traces every call; release emits lean production code (default: %(default)s)")
+    parser.add_argument('--check', action='store_true',
+                        help="write nothing; list generated files that would change, be added"
+                             " or be stale, and exit with status 1 if there are any")
+    parser.add_argument('--diff', action='store_true',
+                        help="like --check, with a unified diff of every such file")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only rewrite files whose content changed")
+    parser.add_argument('--force', action='store_true',
+                        help="overwrite existing files that kxgen did not generate")
+    parser.add_argument('--manifest', default='.kxgen-manifest.json',
+                        help="digest manifest used by --incremental")
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help="render files in N parallel processes")
+    parser.add_argument('--output-cache', metavar='DIR',
+                        help="reuse rendered files from, and add them to, a cache in DIR"
+                             " that other checkouts may share")
+    parser.add_argument('--output-cache-size', type=int, default=256, metavar='MB',
+                        help="evict the least recently used --output-cache entries beyond"
+                             " this size (default: %(default)s)")
+    parser.add_argument('--write-jobs', type=int, default=1, metavar='N',
+                        help="write files from N threads, each renamed into place when complete")
+    parser.add_argument('--changed', action='append', metavar='NAME',
+                        help="only regenerate NAME (e.g. kx::state::State) and its dependents")
+    parser.add_argument('--config', action='append', metavar='DIR',
+                        help="only generate the config whose source or include dir is DIR;"
+                             " types still resolve against all configs")
+    parser.add_argument('--model', metavar='FILE',
+                        help="read the model from a YAML/JSON/TOML file instead of the built-in one")
+    parser.add_argument('--model-cache', default='.kxgen-cache', metavar='DIR',
+                        help="where compiled --model snapshots are kept")
+    parser.add_argument('--no-model-cache', action='store_true',
+                        help="always parse --model from scratch")
+    parser.add_argument('--no-minimize-includes', action='store_true',
+                        help="include the full header of every type used by value")
+    parser.add_argument('--no-validate', action='store_true',
+                        help="skip checking the model for unknown types and include cycles")
+    parser.add_argument('--validate-only', action='store_true',
+                        help="check the model and exit without generating anything")
+    parser.add_argument('--no-devirtualize', action='store_true',
+                        help="emit methods virtual as declared, without final or override")
+    parser.add_argument('--include-report', action='store_true',
+                        help="print header include fan-out before and after minimization to stderr")
+    parser.add_argument('--pack-members', action='store_true',
+                        help="order data members to minimize padding and guard class sizes with static_assert")
+    parser.add_argument('--layout-report', metavar='FILE',
+                        help="write the size, padding and member offsets of every generated class to FILE")
+    parser.add_argument('--meson', action='store_true',
+                        help="also write a meson.build listing the sources of every namespace")
+    parser.add_argument('--unity', type=int, default=0, metavar='N',
+                        help="with --meson, build sources through jumbo files of up to N sources")
+    parser.add_argument('--pch', type=int, default=0, metavar='N',
+                        help="with --meson, precompile the N headers most included by each namespace")
+    parser.add_argument('--watch', action='store_true',
+                        help="keep running and regenerate what changed whenever the model changes")
+    parser.add_argument('--interval', type=float, default=0.2, metavar='SECONDS',
+                        help="how often --watch polls the model sources")
+    parser.add_argument('-v', '--verbose', action='count', default=0,
+                        help="log progress (-v) or debug details (-vv) to stderr")
+    parser.add_argument('--stats', action='store_true',
+                        help="print per-stage timings and counters to stderr")
+    parser.add_argument('--trace', metavar='FILE',
+                        help="write a Chrome trace (chrome://tracing) of the run to FILE")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    verbose = args.verbose + 1 if args.watch else args.verbose
+    logging.basicConfig(
+        level=[logging.WARNING, logging.INFO, logging.DEBUG][min(verbose, 2)],
+        format="%(name)s: %(message)s",
+    )
+    stats.reset(trace=bool(args.trace))
+
+    cache = None
+    if args.output_cache:
+        cache = OutputCache(args.output_cache, args.output_cache_size << 20)
+
+    if args.watch:
+        if args.stdout or args.changed or args.check or args.diff:
+            raise SystemExit("--watch cannot be combined with --stdout, --changed, --check or --diff")
+        Watcher(args.model, Manifest(args.manifest), args.backend, args.interval,
+                minimize=not args.no_minimize_includes, profile=args.profile,
+                devirt=not args.no_devirtualize, pack=args.pack_members, cache=cache,
+                force=args.force).run()
+        return
+
+    with stats.timer('model'):
+        if args.model:
+            try:
+                model = load_model(args.model, None if args.no_model_cache else args.model_cache)
+            except (OSError, ModelError) as e:
+                raise SystemExit(str(e))
+        else:
+            from .configs import configs as model
+    # The model lives until exit; keep the collector from rescanning it.
+    gc.freeze()
+    with stats.timer('deps'):
+        graph = DepGraph.build(model)
+    before = fan_out(graph) if args.include_report else None
+    if not args.no_minimize_includes:
+        with stats.timer('includes'):
+            minimize_includes(graph)
+    if args.include_report:
+        print(report(before, fan_out(graph)), file=sys.stderr)
+    if not args.no_validate or args.validate_only:
+        with stats.timer('validate'):
+            errors = validate(graph, model)
+        for error in errors:
+            print(f"kxgen: error: { error }", file=sys.stderr)
+        if errors:
+            raise SystemExit(1)
+        if args.validate_only:
+            return
+    if not args.no_devirtualize:
+        devirtualize(graph)
+    if args.pack_members or args.layout_report:
+        plans = LayoutPlanner(graph, args.pack_members).plan()
+        if args.layout_report:
+            with open(args.layout_report, 'w') as f:
+                f.write(layout_report(plans))
+    apply_profile(graph, args.profile)
+
+    configs = model
+    if args.config:
+        dirs = {os.path.normpath(d) for d in args.config}
+        configs = [
+            c for c in model
+            if {os.path.normpath(c['source_dir']), os.path.normpath(c['include_dir'])} & dirs
+        ]
+        found = {os.path.normpath(c[k]) for c in configs for k in ('source_dir', 'include_dir')}
+        if dirs - found:
+            raise SystemExit(f"unknown config: { ', '.join(sorted(dirs - found)) }")
+
+    check = args.check or args.diff
+    if args.write_jobs > 1:
+        writer = ConcurrentWriter(args.write_jobs, force=args.force)
+    else:
+        writer = FileWriter(atomic=args.incremental, force=args.force)
+    if check:
+        if args.stdout or args.incremental:
+            raise SystemExit("--check and --diff cannot be combined with --stdout or --incremental")
+        writer = CheckWriter(args.write_jobs, diff=args.diff)
+        emitter = Emitter(writer, backend=args.backend, cache=cache)
+    elif args.stdout:
+        if args.incremental:
+            raise SystemExit("--stdout and --incremental are mutually exclusive")
+        emitter = Emitter(StdoutWriter(), backend=args.backend, cache=cache)
+    elif args.incremental:
+        emitter = IncrementalEmitter(Manifest(args.manifest), backend=args.backend,
+                                     writer=writer, cache=cache)
+    else:
+        emitter = Emitter(writer, backend=args.backend, cache=cache)
+    if args.jobs > 1:
+        emitter = ParallelEmitter(emitter, args.jobs)
+    if args.changed:
+        try:
+            names = graph.affected(args.changed)
+        except KeyError as e:
+            raise SystemExit(f"unknown entity: { e.args[0] }")
+        emitter = SelectiveEmitter(emitter, names)
+    if args.meson or args.unity or args.pch:
+        emitter = MesonEmitter(emitter, [c['source_dir'] for c in configs], args.unity, args.pch)
+
+    if not (args.stdout or check):
+        with stats.timer('mkdir'):
+            emitter.make_dirs(graph.directories(
+                {(c['include_dir'], c['source_dir']) for c in configs}
+            ))
+    try:
+        with stats.timer('generate'):
+            for config in configs:
+                for obj in config['data']:
+                    obj.gen(
+                        inc_dir=config['include_dir'],
+                        src_dir=config['source_dir'],
+                        emitter=emitter,
+                    )
+            emitter.close()
+    except OverwriteError as e:
+        raise SystemExit(str(e))
+
+    drift = 0
+    if check:
+        # With --changed, only part of the output was generated.
+        stale = [] if args.changed else stale_files(
+            Manifest(args.manifest), writer.generated,
+            [c[k] for c in configs for k in ('include_dir', 'source_dir')],
+        )
+        counts = check_report(writer, stale, sys.stdout)
+        drift = sum(counts.values())
+        if drift:
+            details = ', '.join(f"{ n } { status }" for status, n in counts.items() if n)
+            print(f"kxgen: generated files out of date: { details }", file=sys.stderr)
+        else:
+            print(f"kxgen: all { len(writer.generated) } generated files up to date", file=sys.stderr)
+
+    if args.stats:
+        print(stats.report(), file=sys.stderr)
+    if args.trace:
+        stats.write_trace(args.trace)
+    if drift:
+        raise SystemExit(1)
@@ -0,0 +1,143 @@
+import copy
+
+from .model import (
+    Arg, Class, Constructor, Destructor, Function, Method, Module, Namespace,
+    Pointer, Primitive, Type, TypeDef, void,
+)
+
+
+State_update_abstract = Method('update', void,
+    args=[
+        Arg(Type('kx', 'core','Time',), 't')
+    ],
+    const=False,
+    virtual=True,
+    abstract=True
+)
+
+State_update = copy.copy(State_update_abstract)
+State_update.abstract = False
+
+State_draw_abstract = Method('draw',void,
+    args=[
+        Arg(Pointer('kx', 'rend', 'Renderer'), 'renderer')
+    ],
+    const=True,
+    virtual=True,
+    abstract=True
+)
+
+State_draw = copy.copy(State_draw_abstract)
+State_draw.abstract = False
+
+State_on_enter = Method('on_enter', void, virtual=True)
+State_on_leave = Method('on_leave', void, virtual=True)
+
+StateFactory_create_abstract = Method('create',
+    Pointer(Type('kx', 'state', 'State')),
+    args=[
+        Arg(Pointer(Primitive('char const')), 'name')
+    ],
+    const=False,
+    virtual=False,
+    abstract=True
+)
+
+StateFactory_create = copy.copy(StateFactory_create_abstract)
+StateFactory_create.abstract = False
+
+StateManager_switch_to_state = Method('switch_to_state',
+    void,
+    args=[
+        Arg(Pointer('kx', 'state', 'State'), 'state')
+    ],
+)
+
+
+configs = [
+    {
+    'data': [
+        Namespace('kx',[
+            Namespace('core',[
+                Module('time',
+                    TypeDef(Primitive('int'), 'Time'),
+                    Function('get_time',
+                        Primitive('Time')
+                    ),
+                ),  # Module time
+            ]),  # Namespace common
+            Namespace('platform', [
+                Class('Application'),
+            ]),  # Namespace platform
+            Namespace('rend', [
+                Class('Renderer',
+                    methods=[
+                        Constructor(),
+                        Destructor()
+                ]),  # Class Renderer
+            ]),  # Namespace rend
+            Namespace('state', [
+                Class('State',
+                    methods=[
+                        Constructor(),
+                        Destructor(),
+                        State_draw_abstract,
+                        State_update_abstract,
+                        State_on_enter,
+                        State_on_leave
+                    ]  # methods
+                ),  # Class State
+                Class('StateManager',
+                    methods=[
+                        Constructor(),
+                        Destructor(),
+                        StateManager_switch_to_state,
+                    ],  # methods
+                    members=[
+                        Arg(
+                            Pointer(
+                                'kx', 'state',
+                                'State'
+                            ),
+                            'current_state'
+                        )
+                    ],  # members
+                ),  # Class StateManager
+                Class('StateFactory',
+                    methods=[
+                        StateFactory_create_abstract
+                    ],  # methods
+                ),  # Class StateFactory
+            ]),  # Namespace state
+        ])  # Namespace kx
+    ],
+    'include_dir': 'include',
+    'source_dir': 'src',
+    },  # kx
+    {
+    'data': [
+        Namespace('ex43',[
+            Class('ConcreteStateFactory',
+                bases=Type('kx', 'state', 'StateFactory'),
+                methods=[
+                    Constructor(),
+                    StateFactory_create,
+                    ]
+            ),  # Class ConcreteStateFactory
+            Class('MenuState',
+                bases=Type('kx', 'state', 'State'),
+                methods=[
+                    Constructor(),
+                    Destructor(),
+                    State_update,
+                    State_draw,
+                    State_on_enter,
+                    State_on_leave
+                ],  # methods
+            ),  # Class MenuState
+        ])  # Namespace ex43
+    ],
+    'include_dir': 'examples/ex43',
+    'source_dir': 'examples/ex43',
+    },  # case study 4.3
+]
@@ -0,0 +1,70 @@
+from .model import Class, Constructor, Module
+
+
+# The generator sees every class of every config, so it knows the whole
+# hierarchy: methods matching a virtual in a base are emitted as override,
+# leaf classes as final, and virtuals that no subclass can override lose
+# their virtual. Abstract classes are never final.
+
+
+def entity_classes(ent):
+    if isinstance(ent, Class):
+        yield ent
+    elif isinstance(ent, Module):
+        for e in ent.ents:
+            if isinstance(e, Class):
+                yield e
+
+
+def classes(graph):
+    for name, (ns, ent) in graph.entities.items():
+        yield from entity_classes(ent)
+
+
+def state(ent):
+    # What devirtualize decided for an entity's classes. It depends on the
+    # subclasses, which the entity does not depend on.
+    return tuple((c.final, c.overrides, c.sealed) for c in entity_classes(ent))
+
+
+def bases(graph, cls):
+    for b in cls.bases:
+        base = graph.class_of(b)
+        if base is not None:
+            yield base
+
+
+def virtuals(graph, cls, memo, active=()):
+    # Signatures that are virtual in cls: declared virtual there, or
+    # inherited as virtual from a base.
+    key = id(cls)
+    if key not in memo:
+        if key in active:
+            # A base cycle is an error in the model, not ours to report here.
+            return frozenset()
+        sigs = set()
+        for base in bases(graph, cls):
+            sigs |= virtuals(graph, base, memo, (*active, key))
+        sigs.update(m.signature() for m in cls.methods if m.virtual or m.abstract)
+        memo[key] = frozenset(sigs)
+    return memo[key]
+
+
+def devirtualize(graph):
+    all_classes = list(classes(graph))
+    subclassed = {id(base) for cls in all_classes for base in bases(graph, cls)}
+    memo = {}
+    for cls in all_classes:
+        inherited = set()
+        for base in bases(graph, cls):
+            inherited |= virtuals(graph, base, memo)
+        methods = [(m, m.signature()) for m in cls.methods if not isinstance(m, Constructor)]
+        leaf = id(cls) not in subclassed
+        abstract = any(m.abstract for m, sig in methods)
+
+        cls.overrides = frozenset(sig for m, sig in methods if sig in inherited)
+        cls.sealed = frozenset(
+            sig for m, sig in methods
+            if leaf and m.virtual and not m.abstract and sig not in inherited
+        )
+        cls.final = leaf and not abstract
@@ -0,0 +1,112 @@
+import os
+
+from .model import Class, Module, Std, Type, TypeDef, builtin
+from .naming import gen_filename, qualname
+
+
+def symbol(type_):
+    # T * and T name the same symbol.
+    return type_ if type(type_) is Type else Type(type_)
+
+
+class DepGraph:
+    # Entities are keyed by qualified name; a Type resolves to the entity
+    # whose header it includes, so e.g. kx::core::Time maps to kx::core::time.
+    # The graph spans all configs, so a type used by one config resolves to
+    # the entity another config built. Symbols are indexed by their interned
+    # Type, which makes resolving a dict lookup.
+    def __init__(self):
+        self.entities = {}
+        self.dirs = {}
+        self.by_header = {}
+        self.symbols = {}
+        self.classes = {}
+        # (name, earlier name, header) for entities generating the same files.
+        self.clashes = []
+        self.deps = {}
+        self.rdeps = {}
+
+    @classmethod
+    def build(cls, configs):
+        graph = cls()
+        for config in configs:
+            for obj in config['data']:
+                for ns, ent in obj.entities():
+                    graph.add(ns, ent, config['include_dir'], config['source_dir'])
+        graph.link()
+        return graph
+
+    def add(self, ns, ent, inc_dir='include', src_dir='src'):
+        name = qualname(ns, ent.name)
+        header = gen_filename(None, ns, ent.name, '.hpp')
+        if header in self.by_header:
+            self.clashes.append((name, self.by_header[header], header))
+        self.entities[name] = (ns, ent)
+        self.dirs[name] = (inc_dir, src_dir)
+        self.by_header[header] = name
+        for e in (ent.ents if isinstance(ent, Module) else [ent]):
+            if isinstance(e, (Class, TypeDef)):
+                self.symbols[Type(*ns, e.name)] = name
+            if isinstance(e, Class):
+                self.classes[Type(*ns, e.name)] = e
+        self.deps[name] = set()
+        self.rdeps[name] = set()
+
+    def directories(self, roots=None):
+        # The directories entities write their files to, optionally only for
+        # some (include, source) roots.
+        dirs = set()
+        for name, (ns, ent) in self.entities.items():
+            if roots is not None and self.dirs[name] not in roots:
+                continue
+            for filename, suffix in ent.outputs(ns, *self.dirs[name]):
+                dirs.add(os.path.dirname(filename))
+        return dirs
+
+    def resolve(self, type_):
+        if isinstance(type_, Std) or builtin(type_):
+            return None
+        name = self.symbols.get(symbol(type_))
+        if name is None:
+            # Not declared by the model, but may still name a generated header.
+            name = self.by_header.get(gen_filename(None, type_.ns, type_.cls, '.hpp'))
+        return name
+
+    def class_of(self, type_):
+        # The generated class a type names, if any; kx::core::Time resolves to
+        # the time module but is a typedef, not a class.
+        if isinstance(type_, Std) or builtin(type_):
+            return None
+        return self.classes.get(symbol(type_))
+
+    def link(self):
+        for name, (ns, ent) in self.entities.items():
+            types = list(ent.deps)
+            types.extend(getattr(ent, 'bases', []))
+            for t in types:
+                dep = self.resolve(t)
+                if dep is not None and dep != name:
+                    self.deps[name].add(dep)
+                    self.rdeps[dep].add(name)
+
+    def affected(self, changed):
+        unknown = [n for n in changed if n not in self.entities]
+        if unknown:
+            raise KeyError(', '.join(unknown))
+        seen = set(changed)
+        # A base class is final, and its virtuals may be dropped, only as long
+        # as nothing derives from it, so a changed class can change its bases.
+        for name in changed:
+            ent = self.entities[name][1]
+            for cls in (ent.ents if isinstance(ent, Module) else [ent]):
+                for b in getattr(cls, 'bases', ()):
+                    base = self.resolve(b)
+                    if base is not None:
+                        seen.add(base)
+        todo = list(changed)
+        while todo:
+            for r in self.rdeps[todo.pop()]:
+                if r not in seen:
+                    seen.add(r)
+                    todo.append(r)
+        return seen
@@ -0,0 +1,112 @@
+from .model import (
+    IOSTREAMS, Class, FwdDep, Function, HardDep, Module, Pointer, Std, Type,
+    TypeDef, builtin,
+)
+
+
+# Use sites, from what a header needs least to most:
+#   decl    - argument or return type in a declaration; an incomplete type
+#             will do, the definition in the source includes the full header
+#   typedef - aliasing an incomplete type is fine too
+#   member  - by-value data members need the layout
+#   base    - so do base classes
+LAYOUT = ('member', 'base')
+
+
+def uses(ent):
+    if isinstance(ent, Function):
+        if ent.return_type is not None:
+            yield ent.return_type, 'decl'
+        for a in ent.args:
+            yield a.type, 'decl'
+    elif isinstance(ent, TypeDef):
+        yield ent.type, 'typedef'
+    elif isinstance(ent, Class):
+        for m in ent.methods:
+            yield from uses(m)
+        for m in ent.members:
+            yield m.type, 'member'
+        for b in ent.bases:
+            yield b, 'base'
+    elif isinstance(ent, Module):
+        for e in ent.ents:
+            yield from uses(e)
+
+
+def weakest(graph, name, type_, site):
+    if type_ is None or builtin(type_):
+        return None
+    if graph.resolve(type_) == name:
+        # Declared by the entity's own header.
+        return None
+    if isinstance(type_, Std):
+        return HardDep(type_)
+    if isinstance(type_, Pointer) or site not in LAYOUT:
+        # Generated _fwd.hpp files only declare classes.
+        if graph.class_of(type_) is not None:
+            return FwdDep(type_)
+        if isinstance(type_, Pointer) and graph.resolve(type_) is None:
+            # Not generated here; assume a _fwd.hpp as Obj.add_dep does.
+            return FwdDep(type_)
+    return HardDep(type_)
+
+
+def minimize(graph, name, ent):
+    deps = {IOSTREAMS.type: IOSTREAMS}
+    for type_, site in uses(ent):
+        dep = weakest(graph, name, type_, site)
+        if dep is None:
+            continue
+        # T and T * share their headers, so they share an entry too.
+        key = Type(dep.type) if isinstance(dep.type, Pointer) else dep.type
+        v = deps.get(key)
+        if v is None or v.rank < dep.rank:
+            deps[key] = dep
+    ent.deps = deps
+
+
+def minimize_includes(graph):
+    for name, (ns, ent) in graph.entities.items():
+        minimize(graph, name, ent)
+        if isinstance(ent, Module):
+            for e in ent.ents:
+                if isinstance(e, Class):
+                    minimize(graph, name, e)
+
+
+def fan_out(graph):
+    # Direct #includes over all generated headers, and the number of
+    # distinct headers each one pulls in transitively.
+    headers = {
+        f'#include "{ path }"': name for path, name in graph.by_header.items()
+    }
+    includes = {}
+    for name, (ns, ent) in graph.entities.items():
+        includes[name] = [
+            inc for inc in (d.as_header_include() for d in ent.deps.values()) if inc
+        ]
+
+    direct = transitive = 0
+    for name, incs in includes.items():
+        direct += len(incs)
+        seen = set()
+        todo = list(incs)
+        while todo:
+            inc = todo.pop()
+            if inc in seen:
+                continue
+            seen.add(inc)
+            dep = headers.get(inc)
+            if dep is not None:
+                todo.extend(includes[dep])
+        transitive += len(seen)
+    return {'headers': len(includes), 'direct': direct, 'transitive': transitive}
+
+
+def report(before, after):
+    lines = [f"{ 'header includes':24} { 'before':>9} { 'after':>9}"]
+    for key in ('direct', 'transitive'):
+        lines.append(f"{ key:24} { before[key]:9} { after[key]:9}")
+    n = after['headers'] or 1
+    lines.append(f"{ 'transitive per header':24} { before['transitive'] / n:9.1f} { after['transitive'] / n:9.1f}")
+    return '\n'.join(lines)
@@ -0,0 +1,84 @@
+import collections
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+
+
+log = logging.getLogger('kxgen')
+
+
+class Stats:
+    # Aggregated per-stage timers and counters. Individual timer events are
+    # only kept when tracing, since a large model produces one per file.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self, trace=False):
+        self.trace = trace
+        self.start = time.perf_counter()
+        self.timers = collections.defaultdict(float)
+        self.calls = collections.Counter()
+        self.counters = collections.Counter()
+        self.events = []
+
+    @contextlib.contextmanager
+    def timer(self, stage, **args):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start, start, args)
+
+    def add_time(self, stage, seconds, start=None, args=None):
+        with self.lock:
+            self.timers[stage] += seconds
+            self.calls[stage] += 1
+            if self.trace and start is not None:
+                self.events.append({
+                    'name': stage,
+                    'cat': stage.split()[0],
+                    'ph': 'X',
+                    'ts': (start - self.start) * 1e6,
+                    'dur': seconds * 1e6,
+                    'pid': os.getpid(),
+                    'tid': threading.get_ident(),
+                    'args': args or {},
+                })
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] += n
+
+    def report(self):
+        lines = []
+        for stage, seconds in sorted(self.timers.items()):
+            lines.append(f"{ stage:24} { seconds:9.3f} s { self.calls[stage]:8} calls")
+        for name, n in sorted(self.counters.items()):
+            lines.append(f"{ name:24} { n:9}")
+        return '\n'.join(lines)
+
+    def chrome_trace(self):
+        end = (time.perf_counter() - self.start) * 1e6
+        counters = [
+            {'name': name, 'ph': 'C', 'ts': end, 'pid': os.getpid(), 'args': {'value': n}}
+            for name, n in sorted(self.counters.items())
+        ]
+        return {
+            'traceEvents': self.events + counters,
+            'displayTimeUnit': 'ms',
+            'otherData': {
+                'timers': dict(self.timers),
+                'counters': dict(self.counters),
+            },
+        }
+
+    def write_trace(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.chrome_trace(), f)
+
+
+stats = Stats()
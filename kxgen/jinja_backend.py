@@ -0,0 +1,70 @@
+import jinja2
+
+from . import model
+from .naming import gen_filename, guard_token
+from .render import (
+    fun_body, fun_name, fun_quals, include_dep, initializers, size_guard,
+    virt_spec,
+)
+
+
+TEMPLATES = {
+    '_fwd.hpp': 'header_fwd.tmpl',
+    '.hpp': 'header.tmpl',
+    '.cpp': 'source.tmpl',
+}
+
+_env = None
+
+
+def chomp(s):
+    return s[:-1] if s.endswith('\n') else s
+
+
+def environment():
+    # One environment per process; compiled templates are kept in jinja2's
+    # bytecode cache so later runs skip parsing and compiling them.
+    global _env
+    if _env is None:
+        env = jinja2.Environment(
+            loader=jinja2.PackageLoader('kxgen', 'templates'),
+            bytecode_cache=jinja2.FileSystemBytecodeCache(),
+            trim_blocks=True,
+            lstrip_blocks=True,
+            keep_trailing_newline=True,
+            auto_reload=False,
+        )
+        env.filters['chomp'] = chomp
+        env.globals.update(
+            fun_name=fun_name,
+            fun_quals=fun_quals,
+            fun_body=fun_body,
+            initializers=initializers,
+            size_guard=size_guard,
+            virt_spec=virt_spec,
+        )
+        env.tests.update({
+            'class_': lambda x: isinstance(x, model.Class),
+            'typedef': lambda x: isinstance(x, model.TypeDef),
+            'function': lambda x: isinstance(x, model.Function),
+            'method': lambda x: isinstance(x, model.Method),
+            'constructor': lambda x: isinstance(x, model.Constructor),
+        })
+        _env = env
+    return _env
+
+
+def render(ns, obj, suffix):
+    ents = list(obj.ents) if isinstance(obj, model.Module) else [obj]
+    guard = guard_token(ns, obj.name, suffix)
+    includes = [inc for dep in obj.deps.values() for inc in include_dep(dep, suffix)]
+    tmpl = environment().get_template(TEMPLATES[suffix])
+    return tmpl.render(
+        ns=ns,
+        qns='::'.join(ns),
+        obj=obj,
+        ents=ents,
+        guard=guard,
+        includes=includes,
+        self_include=gen_filename(None, ns, obj.name, '.hpp'),
+    )
@@ -0,0 +1,164 @@
+from .model import Class, Module, Pointer, Primitive, Std, TypeDef
+from .naming import qualname
+from .render import virt_spec
+
+
+# Sizes and alignments on an LP64 target (x86-64/aarch64 Linux and macOS).
+POINTER = (8, 8)
+PRIMITIVES = {
+    'bool': (1, 1),
+    'char': (1, 1),
+    'signed char': (1, 1),
+    'unsigned char': (1, 1),
+    'short': (2, 2),
+    'unsigned short': (2, 2),
+    'int': (4, 4),
+    'unsigned': (4, 4),
+    'unsigned int': (4, 4),
+    'long': (8, 8),
+    'unsigned long': (8, 8),
+    'long long': (8, 8),
+    'unsigned long long': (8, 8),
+    'float': (4, 4),
+    'double': (8, 8),
+    'long double': (16, 16),
+    'size_t': (8, 8),
+    'ptrdiff_t': (8, 8),
+    'int8_t': (1, 1),
+    'uint8_t': (1, 1),
+    'int16_t': (2, 2),
+    'uint16_t': (2, 2),
+    'int32_t': (4, 4),
+    'uint32_t': (4, 4),
+    'int64_t': (8, 8),
+    'uint64_t': (8, 8),
+}
+
+
+def round_up(n, align):
+    return -(-n // align) * align
+
+
+class Layout:
+    __slots__ = ('size', 'align', 'fields', 'unpacked')
+
+    def __init__(self, size, align, fields):
+        self.size = size
+        self.align = align
+        # (offset, size, name) in emitted order, vptr included.
+        self.fields = fields
+        # The layout in declaration order, if members were reordered.
+        self.unpacked = None
+
+    @property
+    def padding(self):
+        return self.size - sum(f[1] for f in self.fields)
+
+
+class LayoutPlanner:
+    # Computes the layout of every generated class whose members all have a
+    # known size; classes with bases are left alone, since reproducing the
+    # ABI's base and tail-padding rules is not worth the risk of a wrong
+    # static_assert. With pack, members are sorted by decreasing alignment,
+    # which leaves no padding between them, unless the class keeps its
+    # declaration order.
+    def __init__(self, graph, pack=False):
+        self.graph = graph
+        self.pack = pack
+        self.layouts = {}
+        self.active = set()
+
+    def type_layout(self, type_):
+        if isinstance(type_, Pointer):
+            return POINTER
+        if isinstance(type_, Primitive):
+            words = [w for w in type_.cls.split() if w not in ('const', 'volatile')]
+            return PRIMITIVES.get(' '.join(words))
+        if isinstance(type_, Std):
+            return None
+        cls = self.graph.class_of(type_)
+        if cls is not None:
+            layout = self.class_layout(cls)
+            return layout and (layout.size, layout.align)
+        name = self.graph.resolve(type_)
+        if name is not None:
+            ent = self.graph.entities[name][1]
+            for e in (ent.ents if isinstance(ent, Module) else ()):
+                if isinstance(e, TypeDef) and e.name == type_.cls:
+                    return self.type_layout(e.type)
+        return None
+
+    def class_layout(self, cls):
+        key = id(cls)
+        if key in self.layouts:
+            return self.layouts[key]
+        if cls.bases or key in self.active:
+            return None
+        self.active.add(key)
+        try:
+            sizes = [self.type_layout(m.type) for m in cls.members]
+        finally:
+            self.active.discard(key)
+        if None in sizes:
+            self.layouts[key] = None
+            return None
+
+        members = list(zip(cls.members, sizes))
+        layout = self.place(cls, members)
+        if self.pack and not cls.keep_layout:
+            packed = sorted(members, key=lambda x: -x[1][1])
+            if packed != members:
+                # Reordering changes the ABI; only worth it if the class shrinks.
+                candidate = self.place(cls, packed)
+                if candidate.size < layout.size:
+                    candidate.unpacked = layout
+                    layout = candidate
+                    cls.members = [m for m, _ in packed]
+        self.layouts[key] = layout
+        return layout
+
+    def place(self, cls, members):
+        fields = []
+        offset = 0
+        align = 1
+        if any(virt_spec(m, cls) for m in cls.methods):
+            fields.append((0, POINTER[0], 'vptr'))
+            offset, align = POINTER
+        for m, (size, a) in members:
+            offset = round_up(offset, a)
+            fields.append((offset, size, f"{ m.type.fmt() } { m.name }"))
+            offset += size
+            align = max(align, a)
+        return Layout(round_up(max(offset, 1), align), align, fields)
+
+    def plan(self):
+        plans = []
+        for name, (ns, ent) in self.graph.entities.items():
+            ents = ent.ents if isinstance(ent, Module) else [ent]
+            for e in ents:
+                if isinstance(e, Class):
+                    layout = self.class_layout(e)
+                    e.size = layout.size if self.pack and layout else None
+                    plans.append((qualname(ns, e.name), e, layout))
+        return sorted(plans, key=lambda x: x[0])
+
+
+def report(plans):
+    lines = []
+    total = 0
+    for name, cls, layout in plans:
+        if layout is None:
+            lines.append(f"{ name }: unknown layout")
+            continue
+        total += layout.padding
+        note = ""
+        if layout.unpacked:
+            note = f" (reordered, was size { layout.unpacked.size }, padding { layout.unpacked.padding })"
+        elif cls.keep_layout:
+            note = " (declaration order kept)"
+        lines.append(f"{ name }: size { layout.size }, align { layout.align }, "
+                     f"padding { layout.padding }{ note }")
+        for offset, size, field in layout.fields:
+            lines.append(f"    { offset:5} { size:5}  { field }")
+    lines.append(f"total padding: { total } bytes")
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,258 @@
+import copy
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+
+from .model import (
+    Arg, Class, Constructor, Destructor, Function, Method, Module, Namespace,
+    Pointer, Primitive, Std, Type, TypeDef,
+)
+from .output import generator_version
+
+
+class ModelError(ValueError):
+    pass
+
+
+def parse_type(spec):
+    # "kx::core::Time" -> Type, "kx::rend::Renderer *" -> Pointer,
+    # "int" -> Primitive, "<vector>" -> Std.
+    spec = spec.strip()
+    if spec.startswith('<') and spec.endswith('>'):
+        return Std(spec[1:-1])
+    if spec.endswith('*'):
+        return Pointer(*spec[:-1].strip().split('::'))
+    parts = spec.split('::')
+    if len(parts) == 1:
+        return Primitive(spec)
+    return Type(*parts)
+
+
+def read_model_file(path):
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, 'rb') as f:
+        data = f.read()
+    if ext == '.json':
+        parse = json.loads
+    elif ext in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise ModelError(f"{ path }: PyYAML is required to read YAML models")
+        parse = yaml.safe_load
+    elif ext == '.toml':
+        try:
+            import tomllib
+        except ImportError:
+            raise ModelError(f"{ path }: Python 3.11+ is required to read TOML models")
+        parse = lambda d: tomllib.loads(d.decode())
+    else:
+        raise ModelError(f"{ path }: unknown model format '{ ext }'")
+    try:
+        return parse(data)
+    except Exception as e:
+        raise ModelError(f"{ path }: { e }")
+
+
+class ModelLoader:
+    KINDS = ('namespace', 'class', 'module', 'typedef', 'function', 'method',
+             'constructor', 'destructor')
+    FLAGS = ('virtual', 'abstract', 'const')
+    CLASS_FLAGS = ('virtual', 'keep_layout')
+
+    def __init__(self, source, memo=None):
+        self.source = source
+        self.shared = {}
+        # Entities built by a previous load of the same source, keyed by
+        # their definition; unchanged entities are reused as is.
+        self.memo = memo if memo is not None else {}
+        self.used = {}
+        self.shared_key = None
+
+    def error(self, where, msg):
+        raise ModelError(f"{ self.source }: { where }: { msg }")
+
+    def check(self, node, where, allowed):
+        if not isinstance(node, dict):
+            self.error(where, f"expected a mapping, got { type(node).__name__ }")
+        unknown = sorted(set(node) - set(allowed))
+        if unknown:
+            self.error(where, f"unknown keys { ', '.join(unknown) }")
+
+    def kind(self, node, where, kinds):
+        if not isinstance(node, dict):
+            self.error(where, f"expected a mapping, got { type(node).__name__ }")
+        found = [k for k in self.KINDS if k in node]
+        if len(found) != 1 or found[0] not in kinds:
+            self.error(where, f"expected exactly one of { ', '.join(kinds) }")
+        return found[0]
+
+    def string(self, node, key, where, required=True):
+        value = node.get(key)
+        if value is None and not required:
+            return None
+        if not isinstance(value, str):
+            self.error(where, f"'{ key }' must be a string")
+        return value
+
+    def flags(self, node, where, names=FLAGS):
+        flags = {}
+        for flag in names:
+            if flag in node:
+                if not isinstance(node[flag], bool):
+                    self.error(where, f"'{ flag }' must be true or false")
+                flags[flag] = node[flag]
+        return flags
+
+    def type_(self, node, key, where, required=True):
+        spec = self.string(node, key, where, required)
+        return None if spec is None else parse_type(spec)
+
+    def items(self, node, key, where):
+        value = node.get(key, [])
+        if not isinstance(value, list):
+            self.error(where, f"'{ key }' must be a list")
+        return [(f"{ where }.{ key }[{ i }]", v) for i, v in enumerate(value)]
+
+    def load(self, doc):
+        self.check(doc, 'model', ('methods', 'configs'))
+        shared = doc.get('methods', {})
+        if not isinstance(shared, dict):
+            self.error('methods', "must be a mapping of name to method")
+        # Shared methods may refer to earlier ones, e.g. a concrete override
+        # of an abstract method.
+        for name, node in shared.items():
+            self.shared[name] = self.method(node, f"methods.{ name }")
+        self.shared_key = json.dumps(shared, sort_keys=True, default=str)
+
+        configs = []
+        for where, config in self.items(doc, 'configs', 'model'):
+            self.check(config, where, ('data', 'include_dir', 'source_dir'))
+            configs.append({
+                'data': [self.namespace(n, w) for w, n in self.items(config, 'data', where)],
+                'include_dir': self.string(config, 'include_dir', where),
+                'source_dir': self.string(config, 'source_dir', where),
+            })
+        return configs
+
+    def namespace(self, node, where, ns=()):
+        self.kind(node, where, ('namespace',))
+        self.check(node, where, ('namespace', 'objs'))
+        name = self.string(node, 'namespace', where)
+        objs = []
+        for w, obj in self.items(node, 'objs', where):
+            kind = self.kind(obj, w, ('namespace', 'class', 'module'))
+            if kind == 'namespace':
+                objs.append(self.namespace(obj, w, (*ns, name)))
+            else:
+                objs.append(self.entity(kind, obj, w, (*ns, name)))
+        return Namespace(name, objs)
+
+    def entity(self, kind, node, where, ns):
+        # The passes annotate entities in place, so the same definition in
+        # two namespaces must not become one object.
+        key = (kind, ns, self.shared_key, json.dumps(node, sort_keys=True, default=str))
+        ent = self.memo.get(key)
+        if ent is None:
+            ent = getattr(self, kind.replace('class', 'class_'))(node, where)
+        self.used[key] = ent
+        return ent
+
+    def class_(self, node, where):
+        self.check(node, where, ('class', 'bases', 'methods', 'members') + self.CLASS_FLAGS)
+        flags = self.flags(node, where, self.CLASS_FLAGS)
+        return Class(
+            self.string(node, 'class', where),
+            virtual=flags.get('virtual', True),
+            keep_layout=flags.get('keep_layout', False),
+            bases=[self.base(b, w) for w, b in self.items(node, 'bases', where)],
+            methods=[self.method(m, w) for w, m in self.items(node, 'methods', where)],
+            members=[self.arg(m, w) for w, m in self.items(node, 'members', where)],
+        )
+
+    def base(self, node, where):
+        if not isinstance(node, str):
+            self.error(where, "base must be a type name")
+        return parse_type(node)
+
+    def module(self, node, where):
+        self.check(node, where, ('module', 'ents'))
+        ents = []
+        for w, ent in self.items(node, 'ents', where):
+            kind = self.kind(ent, w, ('typedef', 'function', 'class'))
+            ents.append(getattr(self, kind.replace('class', 'class_'))(ent, w))
+        return Module(self.string(node, 'module', where), *ents)
+
+    def typedef(self, node, where):
+        self.check(node, where, ('typedef', 'type'))
+        return TypeDef(self.type_(node, 'type', where), self.string(node, 'typedef', where))
+
+    def function(self, node, where):
+        self.check(node, where, ('function', 'returns', 'args'))
+        return Function(
+            self.string(node, 'function', where),
+            self.type_(node, 'returns', where, required=False),
+            [self.arg(a, w) for w, a in self.items(node, 'args', where)],
+        )
+
+    def arg(self, node, where):
+        self.check(node, where, ('name', 'type'))
+        return Arg(self.type_(node, 'type', where), self.string(node, 'name', where))
+
+    def method(self, node, where):
+        if isinstance(node, str):
+            if node not in self.shared:
+                self.error(where, f"unknown shared method '{ node }'")
+            return self.shared[node]
+        if isinstance(node, dict) and 'use' in node:
+            # A copy of a shared method with some flags overridden.
+            self.check(node, where, ('use',) + self.FLAGS)
+            m = copy.copy(self.method(self.string(node, 'use', where), where))
+            for flag, value in self.flags(node, where).items():
+                setattr(m, flag, value)
+            return m
+
+        kind = self.kind(node, where, ('method', 'constructor', 'destructor'))
+        if kind == 'constructor':
+            self.check(node, where, ('constructor', 'args'))
+            return Constructor([self.arg(a, w) for w, a in self.items(node, 'args', where)])
+        if kind == 'destructor':
+            self.check(node, where, ('destructor', 'virtual'))
+            return Destructor(**self.flags(node, where))
+        self.check(node, where, ('method', 'returns', 'args') + self.FLAGS)
+        return Method(
+            self.string(node, 'method', where),
+            self.type_(node, 'returns', where, required=False),
+            [self.arg(a, w) for w, a in self.items(node, 'args', where)],
+            **self.flags(node, where),
+        )
+
+
+def load_model(path, cache_dir=None, memo=None):
+    # The compiled model (with deps already resolved) is pickled under a key
+    # made of the model file's hash and the generator version.
+    if memo is not None:
+        # Reloading in place (--watch): reuse unchanged entities instead.
+        loader = ModelLoader(path, memo)
+        configs = loader.load(read_model_file(path))
+        memo.clear()
+        memo.update(loader.used)
+        return configs
+
+    with open(path, 'rb') as f:
+        key = hashlib.sha256(f.read() + generator_version().encode()).hexdigest()
+    cached = os.path.join(cache_dir, f"model-{ key }.pickle") if cache_dir else None
+    if cached and os.path.exists(cached):
+        with open(cached, 'rb') as f:
+            return pickle.load(f)
+
+    configs = ModelLoader(path).load(read_model_file(path))
+    if cached:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=cache_dir, prefix='.', suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(configs, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cached)
+    return configs
@@ -0,0 +1,146 @@
+import collections
+import os
+
+from .output import Emitter
+from .render import MARKER, include_dep
+
+
+HEADER = "# Generated by kxgen; do not edit."
+
+
+def meson_list(name, files):
+    lines = [f"{ name } = files("]
+    lines.extend(f"    '{ f }'," for f in files)
+    lines.append(")")
+    return lines
+
+
+def chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class MesonEmitter(Emitter):
+    # Wraps another emitter and, at close, writes a meson.build into every
+    # generated source directory. Each one lists that namespace's sources
+    # as <ns>_sources; the one at a config's source root also collects
+    # them all as <root>_sources. With unity > 0 the sources of a namespace
+    # are compiled through jumbo translation units of up to that many files.
+    # With pch > 0 the up to pch headers most included by a namespace's
+    # sources go into a precompiled header, exposed as <ns>_pch.
+    def __init__(self, inner, roots, unity=0, pch=0):
+        self.inner = inner
+        self.roots = [os.path.normpath(r) for r in roots]
+        self.unity = unity
+        self.pch = pch
+        self.sources = {}
+        self.includes = collections.defaultdict(collections.Counter)
+
+    def emit(self, filename, ns, obj, suffix, force=False):
+        if suffix == '.cpp':
+            dirname, basename = os.path.split(os.path.normpath(filename))
+            entry = self.sources.setdefault(dirname, ('_'.join(ns), []))
+            entry[1].append(basename)
+            if self.pch:
+                # What the source includes, directly or through its own header.
+                self.includes[dirname].update({
+                    inc
+                    for dep in obj.deps.values()
+                    for s in ('.hpp', '.cpp')
+                    for inc in include_dep(dep, s)
+                })
+        self.inner.emit(filename, ns, obj, suffix, force)
+
+    def emit_data(self, filename, data):
+        self.inner.emit_data(filename, data)
+
+    def make_dirs(self, paths):
+        self.inner.make_dirs(paths)
+
+    def root_of(self, dirname):
+        best = None
+        for root in self.roots:
+            if dirname == root or dirname.startswith(root + os.sep):
+                if best is None or len(root) > len(best):
+                    best = root
+        return best
+
+    def unity_files(self, dirname, ns, files):
+        units = []
+        for i, group in enumerate(chunks(files, self.unity)):
+            name = f"{ ns }_unity_{ i }.cpp"
+            lines = [MARKER]
+            lines.extend(f'#include "{ f }"' for f in group)
+            self.inner.emit_data(os.path.join(dirname, name), '\n'.join(lines) + '\n')
+            units.append(name)
+        return units
+
+    def pch_file(self, dirname, ns):
+        # Only headers shared by at least two sources are worth precompiling.
+        common = [
+            (inc, n) for inc, n in self.includes[dirname].items() if n > 1
+        ]
+        # A full header already declares what its _fwd.hpp does.
+        full = {inc for inc, n in common}
+        common = [
+            (inc, n) for inc, n in common
+            if not (inc.endswith('_fwd.hpp"') and inc[:-9] + '.hpp"' in full)
+        ]
+        if not common:
+            return None
+        common.sort(key=lambda x: (-x[1], x[0]))
+        # System headers first, as a hand-written header would.
+        lines = sorted(
+            (inc for inc, n in common[:self.pch]),
+            key=lambda inc: (not inc.startswith('#include <'), inc),
+        )
+        name = f"{ ns }_pch.hpp"
+        data = '\n'.join([MARKER, "#pragma once", "", *lines, ""])
+        self.inner.emit_data(os.path.join(dirname, 'pch', name), data)
+        return f"pch/{ name }"
+
+    def fragments(self):
+        # Directory tree from each root down to every directory with sources.
+        children = {}
+        for dirname in self.sources:
+            root = self.root_of(dirname)
+            if root is None:
+                continue
+            children.setdefault(root, set())
+            while dirname != root:
+                parent = os.path.dirname(dirname)
+                children.setdefault(parent, set()).add(os.path.basename(dirname))
+                children.setdefault(dirname, set())
+                dirname = parent
+
+        for dirname in sorted(children):
+            lines = [HEADER, ""]
+            for child in sorted(children[dirname]):
+                lines.append(f"subdir('{ child }')")
+            if children[dirname]:
+                lines.append("")
+            if dirname in self.sources:
+                ns, files = self.sources[dirname]
+                files = sorted(files)
+                if self.unity:
+                    files = self.unity_files(dirname, ns, files)
+                lines.extend(meson_list(f"{ ns }_sources", files))
+                lines.append("")
+                pch = self.pch and self.pch_file(dirname, ns)
+                if pch:
+                    lines.append(f"{ ns }_pch = files('{ pch }')")
+                    lines.append("")
+            if dirname in self.roots:
+                names = sorted(
+                    ns for d, (ns, _) in self.sources.items()
+                    if self.root_of(d) == dirname
+                )
+                total = ' + '.join(f"{ n }_sources" for n in names) or "[]"
+                lines.append(f"{ dirname.replace(os.sep, '_').replace('.', '_') }_sources = { total }")
+                lines.append("")
+            yield os.path.join(dirname, 'meson.build'), '\n'.join(lines)
+
+    def close(self):
+        for filename, data in self.fragments():
+            self.inner.emit_data(filename, data)
+        self.inner.close()
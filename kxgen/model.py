@@ -0,0 +1,575 @@
+from . import output, render
+from .instrument import log, stats
+from .naming import ensure_list, gen_filename
+
+
+class Obj:
+    __slots__ = ('deps',)
+
+    def __init__(self):
+        self.deps = {IOSTREAMS.type: IOSTREAMS}
+
+    def gen(self, ns=[], inc_dir='include', src_dir='src', emitter=None):
+        pass
+
+    def outputs(self, ns, inc_dir='include', src_dir='src'):
+        src_ns = ns
+        if 'kx' in ns:
+            src_ns = [x for x in ns if x != 'kx']
+        return [
+            (gen_filename(inc_dir, ns, self.name, '_fwd.hpp'), '_fwd.hpp'),
+            (gen_filename(inc_dir, ns, self.name, '.hpp'), '.hpp'),
+            (gen_filename(src_dir, src_ns, self.name, '.cpp'), '.cpp'),
+        ]
+
+    def fwd_decl(self, ns, indent=None):
+        pass
+
+    def decl(self, ns, indent=None):
+        pass
+
+    def src_def(self, ns, indent=None):
+        pass
+
+    def add_dep(self, x):
+        if x is None:
+            return
+        if isinstance(x, Type) and builtin(x):
+            return
+
+        if isinstance(x, Type):
+            if isinstance(x, Pointer):
+                y = FwdDep(x)
+            else:
+                y = HardDep(x)
+        elif isinstance(x, Dep):
+            y = x
+        else:
+            return
+
+        # Keep the strongest dependency per type: Src -> Fwd -> Hard.
+        v = self.deps.get(y.type)
+        if v is None or v.rank < y.rank:
+            self.deps[y.type] = y
+
+
+class Fmtable:
+    def fmt_fwd_decl(self):
+        pass
+
+    def fmt_decl(self):
+        pass
+
+    def fmt_def(self):
+        pass
+
+
+class Namespace:
+    __slots__ = ('name', 'objs')
+
+    def __init__(self,
+                 name,
+                 objs,
+                 ):
+        self.name = name
+        self.objs = objs
+
+    def gen(self, ns=[], inc_dir='include', src_dir='src', emitter=None):
+        _ns = [n for n in ns]
+        _ns.append(self.name)
+
+        log.debug("Namespace %s", '::'.join(_ns))
+
+        for o in self.objs:
+            o.gen(_ns, inc_dir=inc_dir, src_dir=src_dir, emitter=emitter)
+
+    def entities(self, ns=[]):
+        _ns = [*ns, self.name]
+        for o in self.objs:
+            if isinstance(o, Namespace):
+                yield from o.entities(_ns)
+            else:
+                yield _ns, o
+
+
+class CodeFile:
+    def __init__(self,
+                 *,
+                 classess=None,
+                 funcs=None,
+                ):
+        if not classes:
+            classes = []
+        self.classes = classes
+
+        if not funcs:
+            funcs = []
+        self.funcs = funcs
+
+
+class HeaderFwd(CodeFile):
+    def __init__(self,
+                 *args,
+                 **kwargs
+                ):
+        super().__init__(*args, **kwargs)
+
+
+class Header(CodeFile):
+    def __init__(self,
+                 *args,
+                 **kwargs
+                ):
+        super().__init__(*args, **kwargs)
+
+
+class Source(CodeFile):
+    def __init__(self,
+                 *args,
+                 **kwargs
+                ):
+        super().__init__(*args, **kwargs)
+
+
+class Function(Obj):
+    __slots__ = ('name', 'template', 'return_type', 'args', 'abstract', 'trace', 'noexcept')
+
+    def __init__(self,
+                 name,
+                 return_type,
+                 args=[],
+                 *,
+                 template=False,
+                ):
+        self.name = name
+        self.template = template
+        self.return_type = return_type
+        self.args = args
+        self.abstract = False
+        self.trace = True
+        self.noexcept = False
+
+    def key(self):
+        # Value identity of the declaration; computed on demand since shared
+        # methods are copied and then tweaked (e.g. abstract=False).
+        return (
+            type(self).__name__,
+            self.name,
+            self.return_type,
+            tuple((a.type, a.name) for a in self.args),
+            self.template,
+            getattr(self, 'virtual', False),
+            self.abstract,
+            getattr(self, 'const', False),
+            self.trace,
+            self.noexcept,
+            getattr(self, 'defaulted', False),
+            getattr(self, 'inline', False),
+        )
+
+    def signature(self):
+        # What an overriding method has to match.
+        return (
+            self.name,
+            tuple(a.type for a in self.args),
+            getattr(self, 'const', False),
+        )
+
+    def decl(self, ns, indent=None):
+        yield from render.gen_fun_decl(self, indent=indent)
+
+    def src_def(self, ns, indent=None):
+        indent = " "*4
+        if self.return_type:
+            yield f"{ self.return_type.fmt() }"
+        yield f"{ self.name }(" + ("" if self.args else ")")
+        if self.args:
+            for i, arg in enumerate(self.args):
+                yield f"{ indent }{ arg.type.fmt() } { arg.name }" + ("" if i == (len(self.args) - 1) else ",")
+            yield ")"
+        quals = render.fun_quals(self, decl=False)
+        if quals:
+            yield ' '.join(quals)
+
+        yield "{"
+        yield from render.fun_body(ns, self)
+        yield f"}} // function { self.name }"
+        yield ""
+
+
+class Method(Function):
+    __slots__ = ('virtual', 'const', 'defaulted', 'inline')
+
+    def __init__(self,
+                 name,
+                 return_type,
+                 args=[],
+                 *,
+                 template=False,
+                 virtual=False,
+                 abstract=False,
+                 const=False,
+                ):
+        super().__init__(
+                name,
+                return_type,
+                args,
+                template=template
+        )
+        self.virtual = virtual
+        self.abstract = abstract
+        self.const = const
+        self.defaulted = False
+        self.inline = False
+
+
+class Constructor(Method):
+    __slots__ = ()
+
+    def __init__(self,
+                 args=[],
+                 *,
+                 template=False
+                ):
+        super().__init__(
+            'Constructor',
+            None,
+            args,
+            template=template,
+            virtual=False,
+        )
+
+
+class Destructor(Method):
+    __slots__ = ()
+
+    def __init__(self,
+                 *,
+                 virtual=True,
+                ):
+        super().__init__(
+            'Destructor',
+            None,
+            template=False,
+            virtual=virtual,
+        )
+
+
+class Type:
+    __slots__ = ('cls', 'ns', '_hash', '_fmt', '_include', '_fwd_include')
+
+    # Types are interned: spelling the same type twice yields the same
+    # instance, whose formatted name and include lines are computed once.
+    registry = {}
+
+    def __new__(cls, *args):
+        if len(args) == 1 and isinstance(args[0], Type):
+            args = (*args[0].ns, args[0].cls)
+        key = (cls, *args)
+        self = Type.registry.get(key)
+        if self is None:
+            self = super().__new__(cls)
+            self.cls = args[-1]
+            self.ns = tuple(args[:-1])
+            self._hash = hash(self.key())
+            self._fmt = self.spell()
+            self._include = self.include_line()
+            self._fwd_include = self.fwd_include_line()
+            self = Type.registry.setdefault(key, self)
+        return self
+
+    def __init__(self, *args):
+        pass
+
+    def __reduce__(self):
+        # Re-intern on unpickling; this also recomputes the hash, which is
+        # only valid in the process that computed it.
+        return (type(self), (*self.ns, self.cls))
+
+    def __repr__(self):
+        return f"Type({self.ns}, {self.cls})"
+
+    def key(self):
+        return (type(self).__name__, self.ns, self.cls)
+
+    def __eq__(self, other):
+        return self is other or isinstance(other, Type) and self.key() == other.key()
+
+    def __hash__(self):
+        return self._hash
+
+    def fmt(self) -> str:
+        return self._fmt
+
+    def as_include(self):
+        return self._include
+
+    def as_fwd_include(self):
+        return self._fwd_include
+
+    def spell(self):
+        if self.ns:
+            return f"{ '::'.join(list(self.ns)) }::{ self.cls }"
+        else:
+            return f"{ self.cls }"
+
+    def include_line(self):
+        return f'#include "{ gen_filename(None, self.ns, self.cls, ".hpp") }"'
+
+    def fwd_include_line(self):
+        return f'#include "{ gen_filename(None, self.ns, self.cls, "_fwd.hpp") }"'
+
+
+class Primitive(Type):
+    __slots__ = ()
+
+    def spell(self):
+        return f"{ self.cls }"
+
+
+void = Primitive('void')
+
+class Pointer(Type):
+    __slots__ = ()
+
+    def spell(self):
+        return f"{ super().spell() } *"
+
+
+class Std(Type):
+    __slots__ = ()
+
+    def include_line(self):
+        return f"#include <{ self.cls }>"
+
+    def fwd_include_line(self):
+        return
+
+
+def builtin(type_):
+    # Primitives and pointers to them, e.g. "char const *": nothing to
+    # include. Generated types always live in a namespace.
+    return isinstance(type_, Primitive) or not type_.ns and not isinstance(type_, Std)
+
+
+class TypeDef(Obj):
+    __slots__ = ('type', 'name')
+
+    def __init__(self, type_, name):
+        self.type = type_
+        self.name = name
+
+    def fmt(self):
+        return f"typedef {self.type.fmt()} {self.name};"
+
+    def decl(self, ns=None, indent=None):
+        if indent is None:
+            indent = "    "
+
+        yield f"{indent}{self.fmt()}"
+
+
+class Dep:
+    __slots__ = ('type',)
+
+    rank = 0
+
+    def __init__(self, type_):
+        self.type = type_
+
+    def __repr__(self):
+        return f"Dep({self.type})"
+
+    def __eq__(self, other):
+        return isinstance(other, Dep) and self.type == other.type
+
+    def __hash__(self):
+        return hash(self.type)
+
+    def as_header_include(self):
+        pass
+
+    def as_src_include(self):
+        pass
+
+
+class HardDep(Dep):
+    __slots__ = ()
+
+    rank = 3
+
+    def __init__(self, type_):
+        super().__init__(type_)
+
+    def __repr__(self):
+        return f"HardDep({self.type})"
+
+    def as_header_include(self):
+        return self.type.as_include()
+
+
+class FwdDep(HardDep):
+    __slots__ = ()
+
+    rank = 2
+
+    def __init__(self, type_):
+        super().__init__(type_)
+
+    def __repr__(self):
+        return f"FwdDep({self.type})"
+
+    def as_header_include(self):
+        return self.type.as_fwd_include()
+
+    def as_src_include(self):
+        return self.type.as_include()
+
+
+class SrcDep(FwdDep):
+    __slots__ = ()
+
+    rank = 1
+
+    def __init__(self, type_):
+        super().__init__(type_)
+
+    def __repr__(self):
+        return f"SrcDep({self.type})"
+
+    def as_src_include(self):
+        return self.type.as_include()
+
+
+# Every entity starts out depending on this one; Deps are never mutated, so
+# a single instance is shared.
+IOSTREAMS = SrcDep(Std("iostreams"))
+
+
+class Arg:
+    __slots__ = ('type', 'name')
+
+    def __init__(self, type_, name):
+        self.type = type_
+        self.name = name
+
+
+class Class(Obj): #(HeaderFwd, Header, Source):
+    __slots__ = ('name', 'virtual', 'methods', 'bases', 'members', 'keep_layout',
+                 'final', 'overrides', 'sealed', 'size')
+
+    def __init__(self,
+                 name,
+                 *,
+                 virtual=True,
+                 methods=None,
+                 bases=None,
+                 members=None,
+                 keep_layout=False,
+                ):
+        super().__init__()
+        self.name = name
+        self.virtual = virtual
+        self.methods = ensure_list(methods)
+
+        self.bases = ensure_list(bases)
+        self.members = ensure_list(members)
+        # Members of ABI-sensitive classes keep their declaration order.
+        self.keep_layout = keep_layout
+
+        # Filled in by the devirtualization pass: signatures of methods that
+        # override a base class method, and of virtual methods that nothing
+        # overrides in a leaf class.
+        self.final = False
+        self.overrides = frozenset()
+        self.sealed = frozenset()
+        # Set by the layout pass when the size is known, to guard it.
+        self.size = None
+
+        for m in self.methods:
+            self.add_dep(m.return_type)
+            for a in m.args:
+                self.add_dep(a.type)
+
+        for m in self.members:
+            self.add_dep(m.type)
+
+        log.debug("%r deps = %r", self, self.deps)
+
+    def __repr__(self):
+        return f"Class({self.name}, bases={self.bases}, methods={self.methods})"
+
+    def fwd_decl(self, ns, indent=None):
+        yield "    // Forward declaration"
+        yield f"    class { self.name };"
+        yield ""
+
+    def decl(self, ns, indent=None):
+        _class_decl = render.class_decl()
+        yield from _class_decl(ns, self, ".hpp")
+
+    def src_def(self, ns, indent=None):
+        _class_def = render.class_def()
+        yield from _class_def(ns, self, ".hpp")
+
+    def gen(self, ns, inc_dir='include', src_dir='src', emitter=None):
+        log.debug("Class %s::%s", '::'.join(ns), self.name)
+        stats.count('entities')
+        if emitter is None:
+            emitter = output.Emitter()
+        for filename, suffix in self.outputs(ns, inc_dir, src_dir):
+            emitter.emit(filename, ns, self, suffix)
+
+
+class Module(Obj): #(HeaderFwd, Header, Source):
+    __slots__ = ('name', 'ents')
+
+    def __init__(self,
+                 name,
+                 *ents,
+                ):
+        super().__init__()
+        self.name = name
+        self.ents = ents
+
+        for m in self.ents:
+            if isinstance(m, Function):
+                self.add_dep(m.return_type)
+                for a in m.args:
+                    self.add_dep(a.type)
+            elif isinstance(m, TypeDef):
+                self.add_dep(m.type)
+            elif isinstance(m, Class):
+                for d in m.deps.values():
+                    self.add_dep(d)
+
+        log.debug("%r deps = %r", self, self.deps)
+
+    def __repr__(self):
+        return f"Module({self.name}, ents={self.ents})"
+
+    def fwd_decl(self, ns, indent=None):
+        for ent in self.ents:
+            ent_fwd_decl = ent.fwd_decl(ns)
+            if ent_fwd_decl:
+                yield from ent_fwd_decl
+
+    def decl(self, ns, indent=None):
+        for ent in self.ents:
+            ent_decl = ent.decl(ns)
+            if ent_decl:
+                yield from ent_decl
+
+    def src_def(self, ns, indent=None):
+        for ent in self.ents:
+            ent_src_def = ent.src_def(ns)
+            if ent_src_def:
+                yield from ent_src_def
+
+    def gen(self, ns, inc_dir='include', src_dir='src', emitter=None):
+        log.debug("Module %s::%s", '::'.join(ns), self.name)
+        stats.count('entities')
+        if emitter is None:
+            emitter = output.Emitter()
+        for filename, suffix in self.outputs(ns, inc_dir, src_dir):
+            emitter.emit(filename, ns, self, suffix)
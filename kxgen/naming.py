@@ -0,0 +1,43 @@
+import functools
+import os
+import re
+
+
+@functools.lru_cache(maxsize=None)
+def snake_case(name):
+    s1 = re.sub('(.)([A-Z][a-z]+)', r'\1_\2', name)
+    return re.sub('([a-z0-9])([A-Z])', r'\1_\2', s1).lower()
+
+
+def ensure_list(x):
+    if x is None:
+        x = []
+    elif not isinstance(x, list):
+        x = [x]
+
+    return x
+
+
+def gen_filename(base, ns, name, suffix):
+    if base:
+        return os.path.join(base, *ns, snake_case(name) + suffix)
+    else:
+        return os.path.join(*ns, snake_case(name) + suffix)
+
+
+@functools.lru_cache(maxsize=None)
+def _guard_token(ns, name, suffix):
+    return f"{ '_'.join(ns).upper() }_{ snake_case(name).upper() }{ suffix.replace('.', '_').upper() }_INCLUDED"
+
+
+def guard_token(ns, name, suffix):
+    return _guard_token(tuple(ns), name, suffix)
+
+
+def include_header(ns, mod, suffix):
+    path = "/".join(ns) + f"/{ snake_case(mod) }{ suffix }"
+    return f'#include "{ path  }"'
+
+
+def qualname(ns, name):
+    return '::'.join([*ns, name])
@@ -0,0 +1,470 @@
+import concurrent.futures
+import hashlib
+import json
+import os
+import sys
+import tempfile
+
+from . import model
+from .instrument import log, stats
+from .naming import qualname
+from .render import render, render_all
+
+
+class OverwriteError(Exception):
+    def __init__(self, filenames):
+        super().__init__(
+            f"refusing to overwrite files kxgen did not generate (use --force): { ', '.join(filenames) }"
+        )
+        self.filenames = filenames
+
+
+def generated(filename):
+    # Whether kxgen may write filename: it does not exist, or kxgen wrote it.
+    try:
+        with open(filename, 'rb') as f:
+            first = f.readline(256)
+    except FileNotFoundError:
+        return True
+    return b"Generated by kxgen" in first
+
+
+def write_file(filename, data, dirs=()):
+    dirname = os.path.dirname(filename)
+    if dirname and dirname not in dirs:
+        os.makedirs(dirname, exist_ok=True)
+    with open(filename, 'wb') as f:
+        f.write(data.encode())
+
+
+def replace_file(filename, data, dirs=()):
+    # Write next to the target and rename into place so readers never see a
+    # partially written file.
+    dirname = os.path.dirname(filename) or '.'
+    if dirname not in dirs:
+        os.makedirs(dirname, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=dirname, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data.encode())
+        os.replace(tmp, filename)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class FileWriter:
+    # Unless forced, files that exist but were not generated by kxgen, e.g.
+    # hand-written headers next to generated ones, are left alone and
+    # reported at flush.
+    def __init__(self, atomic=False, force=False):
+        self.atomic = atomic
+        self.force = force
+        # Directories known to exist, which writes need not create.
+        self.dirs = set()
+        # Files whose write failed, in the order they were written.
+        self.failed = []
+
+    def write(self, filename, data):
+        if self.refused(filename):
+            self.failed.append((filename, OverwriteError([filename])))
+            return
+        self.store(filename, data)
+
+    def refused(self, filename):
+        return not self.force and not generated(filename)
+
+    def store(self, filename, data):
+        with stats.timer('write'):
+            dirname = os.path.dirname(filename)
+            if dirname:
+                self.make_dir(dirname)
+            if self.atomic:
+                replace_file(filename, data, self.dirs)
+            else:
+                write_file(filename, data, self.dirs)
+        stats.count('files written')
+        stats.count('bytes written', len(data))
+
+    def make_dir(self, path):
+        if path not in self.dirs:
+            os.makedirs(path, exist_ok=True)
+            self.dirs.add(path)
+
+    def flush(self):
+        self.raise_failed()
+
+    def raise_failed(self):
+        refused = [f for f, error in self.failed if isinstance(error, OverwriteError)]
+        if refused:
+            raise OverwriteError(refused)
+        if self.failed:
+            raise self.failed[0][1]
+
+
+class ConcurrentWriter(FileWriter):
+    # Writes files from up to jobs threads, each renamed into place when
+    # complete. On network file systems per-file latency, not bandwidth,
+    # bounds writing, so overlapping writes pays off. Files are handed over
+    # in batches: a task per file costs the rendering thread more than the
+    # write it saves. A failed write does not stop the others; flush waits
+    # for all of them and raises the error of the first failed file in write
+    # order, so the outcome never depends on thread timing.
+    def __init__(self, jobs, batch=64, force=False):
+        super().__init__(atomic=True, force=force)
+        self.jobs = jobs
+        self.batch = batch
+        self.pool = None
+        self.files = []
+        self.pending = []
+
+    def write(self, filename, data):
+        self.files.append((filename, data))
+        if len(self.files) >= self.batch:
+            self.submit()
+
+    def submit(self):
+        if self.pool is None:
+            self.pool = concurrent.futures.ThreadPoolExecutor(self.jobs, 'kxgen-write')
+        self.pending.append(self.pool.submit(self.write_batch, self.files))
+        self.files = []
+        if len(self.pending) >= 4 * self.jobs:
+            # Bound the file contents held in memory.
+            self.wait(len(self.pending) // 2)
+
+    def write_batch(self, files):
+        failed = []
+        for filename, data in files:
+            try:
+                self.write_one(filename, data)
+            except Exception as e:
+                failed.append((filename, e))
+        return failed
+
+    def write_one(self, filename, data):
+        if self.refused(filename):
+            raise OverwriteError([filename])
+        self.store(filename, data)
+
+    def wait(self, n):
+        done, self.pending = self.pending[:n], self.pending[n:]
+        for future in done:
+            self.failed.extend(future.result())
+
+    def flush(self):
+        if self.files:
+            self.submit()
+        self.wait(len(self.pending))
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+        self.raise_failed()
+
+
+class StdoutWriter:
+    # Coalesces many small files into few large writes on the stream.
+    def __init__(self, stream=None, limit=1 << 16):
+        self.stream = stream or sys.stdout
+        self.limit = limit
+        self.buf = []
+        self.size = 0
+
+    def write(self, filename, data):
+        chunk = f"{ filename }\n{ '-'*10 }\n{ data }"
+        stats.count('files written')
+        stats.count('bytes written', len(chunk))
+        self.buf.append(chunk)
+        self.size += len(chunk)
+        if self.size >= self.limit:
+            self.flush()
+
+    def flush(self):
+        with stats.timer('write'):
+            self.stream.write(''.join(self.buf))
+        self.stream.flush()
+        self.buf = []
+        self.size = 0
+
+
+def attrs(x):
+    try:
+        return vars(x)
+    except TypeError:
+        return {
+            k: getattr(x, k)
+            for c in type(x).__mro__
+            for k in getattr(c, '__slots__', ())
+            if hasattr(x, k)
+        }
+
+
+# Public slot names per class, in the order canonical() sorts dict keys.
+_fields = {}
+
+
+def fields(cls):
+    names = _fields.get(cls)
+    if names is None:
+        names = _fields[cls] = sorted({
+            k for c in cls.__mro__ for k in getattr(c, '__slots__', ())
+            if not k.startswith('_')
+        }, key=repr)
+    return names
+
+
+# Canonical forms of interned Types, which are immutable and live as long
+# as the process, by id; a model spells the same few types over and over.
+_type_canonical = {}
+
+
+def canonical(x):
+    if isinstance(x, (str, int, float, bool, type(None))):
+        return repr(x)
+    if isinstance(x, (list, tuple)):
+        return '[' + ','.join(canonical(v) for v in x) + ']'
+    if isinstance(x, dict):
+        items = sorted((canonical(k), canonical(v)) for k, v in x.items())
+        return '{' + ','.join(f"{ k }:{ v }" for k, v in items) + '}'
+    if isinstance(x, model.Type):
+        c = _type_canonical.get(id(x))
+        if c is None:
+            c = _type_canonical[id(x)] = canonical_obj(x)
+        return c
+    return canonical_obj(x)
+
+
+def canonical_obj(x):
+    if not hasattr(x, '__dict__'):
+        # Same as below, without building the dict for slotted objects.
+        items = ','.join(
+            f"{ repr(k) }:{ canonical(getattr(x, k)) }" for k in fields(type(x)) if hasattr(x, k)
+        )
+        return f"{ type(x).__name__ }{{{ items }}}"
+    # Underscore attributes are caches, not part of the model.
+    state = {k: v for k, v in attrs(x).items() if not k.startswith('_')}
+    return f"{ type(x).__name__ }{ canonical(state) }"
+
+
+_generator_version = None
+
+
+def generator_version():
+    global _generator_version
+    if _generator_version is None:
+        h = hashlib.sha256()
+        pkg = os.path.dirname(os.path.abspath(__file__))
+        names = sorted(n for n in os.listdir(pkg) if n.endswith('.py'))
+        # The templates determine output just as much as the code does.
+        names += sorted(
+            os.path.join('templates', n)
+            for n in os.listdir(os.path.join(pkg, 'templates')) if n.endswith('.tmpl')
+        )
+        for name in names:
+            with open(os.path.join(pkg, name), 'rb') as f:
+                h.update(name.encode())
+                h.update(f.read())
+        _generator_version = h.hexdigest()
+    return _generator_version
+
+
+def fingerprint(ns, obj, suffix, backend='combinators', memo=None):
+    # The files of an entity share the digest of its state; pass the same
+    # memo for a whole run to compute it once per entity, not once per file.
+    key = (id(obj), tuple(ns))
+    entry = memo.get(key) if memo is not None else None
+    if entry is None or entry[0] is not obj:
+        h = hashlib.sha256()
+        h.update(generator_version().encode())
+        h.update(canonical([list(ns), obj]).encode())
+        entry = (obj, h.hexdigest())
+        if memo is not None:
+            memo[key] = entry
+    return hashlib.sha256(f"{ entry[1] } { suffix } { backend }".encode()).hexdigest()
+
+
+def digest(data):
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+class Emitter:
+    def __init__(self, writer=None, backend='combinators', cache=None):
+        self.writer = writer or FileWriter()
+        self.backend = backend
+        self.cache = cache
+        self.memo = {}
+
+    def emit(self, filename, ns, obj, suffix, force=False):
+        if self.wants(filename, ns, obj, suffix, force):
+            key, data = self.lookup(ns, obj, suffix)
+            if data is None:
+                with stats.timer(f'render { suffix }', file=filename):
+                    data = render(ns, obj, suffix, self.backend)
+                stats.count('files rendered')
+                if key is not None:
+                    self.cache.put(key, data)
+            self.write(filename, ns, obj, suffix, data)
+
+    def lookup(self, ns, obj, suffix):
+        # (key, data) from the shared output cache, data None on a miss.
+        if self.cache is None:
+            return None, None
+        key = fingerprint(ns, obj, suffix, self.backend, self.memo)
+        return key, self.cache.get(key)
+
+    def wants(self, filename, ns, obj, suffix, force=False):
+        return True
+
+    def write(self, filename, ns, obj, suffix, data):
+        self.writer.write(filename, data)
+
+    def emit_data(self, filename, data):
+        # Output that is not rendered from an entity, e.g. build files.
+        self.writer.write(filename, data)
+
+    def make_dirs(self, paths):
+        # Creates every output directory up front, once, so that writes
+        # need not make sure of them again.
+        for path in sorted(paths):
+            self.writer.make_dir(path)
+
+    def close(self):
+        try:
+            self.writer.flush()
+        finally:
+            if self.cache is not None:
+                self.cache.close()
+
+
+class Manifest:
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    def get(self, filename):
+        return self.entries.get(filename, {})
+
+    def update(self, filename, key, digest):
+        self.entries[filename] = {'key': key, 'digest': digest}
+
+    def discard(self, filename):
+        self.entries.pop(filename, None)
+
+    def save(self):
+        replace_file(self.path, json.dumps(self.entries, indent=1, sort_keys=True) + "\n")
+
+
+class IncrementalEmitter(Emitter):
+    def __init__(self, manifest, backend='combinators', autosave=True, writer=None, cache=None):
+        super().__init__(writer or FileWriter(atomic=True), backend, cache)
+        self.manifest = manifest
+        self.autosave = autosave
+        self.keys = {}
+        self.written = 0
+        self.unchanged = 0
+        self.skipped = 0
+
+    def wants(self, filename, ns, obj, suffix, force=False):
+        key = fingerprint(ns, obj, suffix, self.backend, self.memo)
+        entry = self.manifest.get(filename)
+        if not force and entry.get('key') == key and os.path.exists(filename):
+            self.skipped += 1
+            stats.count('files skipped')
+            return False
+        self.keys[filename] = key
+        return True
+
+    def write(self, filename, ns, obj, suffix, data):
+        entry = self.manifest.get(filename)
+        _digest = digest(data)
+        if entry.get('digest') == _digest and os.path.exists(filename):
+            self.unchanged += 1
+            stats.count('files unchanged')
+        else:
+            self.writer.write(filename, data)
+            self.written += 1
+        self.manifest.update(filename, self.keys.pop(filename), _digest)
+
+    def emit_data(self, filename, data):
+        entry = self.manifest.get(filename)
+        _digest = digest(data)
+        if entry.get('digest') == _digest and os.path.exists(filename):
+            self.unchanged += 1
+            stats.count('files unchanged')
+        else:
+            self.writer.write(filename, data)
+            self.written += 1
+        self.manifest.update(filename, None, _digest)
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            # Entries are recorded before a concurrent write completes; forget
+            # the failed ones, and keep those that did get written.
+            for filename, error in self.writer.failed:
+                self.manifest.discard(filename)
+            if self.autosave:
+                self.manifest.save()
+        log.info("incremental: %d written, %d unchanged, %d skipped",
+                 self.written, self.unchanged, self.skipped)
+
+
+class SelectiveEmitter(Emitter):
+    # Only emits the selected entities, always re-rendering them so the inner
+    # emitter can decide from the content whether anything changed.
+    def __init__(self, inner, names):
+        self.inner = inner
+        self.names = set(names)
+
+    def emit(self, filename, ns, obj, suffix, force=False):
+        if qualname(ns, obj.name) in self.names:
+            self.inner.emit(filename, ns, obj, suffix, force=True)
+
+    def emit_data(self, filename, data):
+        self.inner.emit_data(filename, data)
+
+    def make_dirs(self, paths):
+        self.inner.make_dirs(paths)
+
+    def close(self):
+        self.inner.close()
+
+
+class ParallelEmitter(Emitter):
+    # Collects render tasks during traversal and renders them all at close.
+    def __init__(self, inner, jobs):
+        self.inner = inner
+        self.jobs = jobs
+        self.tasks = []
+
+    def emit(self, filename, ns, obj, suffix, force=False):
+        if self.inner.wants(filename, ns, obj, suffix, force):
+            self.tasks.append((filename, list(ns), obj, suffix))
+
+    def emit_data(self, filename, data):
+        self.inner.emit_data(filename, data)
+
+    def make_dirs(self, paths):
+        self.inner.make_dirs(paths)
+
+    def close(self):
+        backend = self.inner.backend
+        found = [self.inner.lookup(*t[1:]) for t in self.tasks]
+        misses = [t for t, (key, data) in zip(self.tasks, found) if data is None]
+        with stats.timer('render'):
+            results = iter(render_all([(*t[1:], backend) for t in misses], self.jobs))
+        for task, (key, data) in zip(self.tasks, found):
+            if data is None:
+                data, seconds = next(results)
+                # Worker time, summed over all processes.
+                stats.add_time(f'render { task[3] }', seconds)
+                stats.count('files rendered')
+                if key is not None:
+                    self.inner.cache.put(key, data)
+            self.inner.write(*task, data)
+        self.tasks = []
+        self.inner.close()
+
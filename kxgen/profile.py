@@ -0,0 +1,66 @@
+import copy
+
+from .model import (
+    IOSTREAMS, Class, Constructor, Destructor, Function, Module, Pointer,
+    Primitive,
+)
+from .render import virt_spec
+
+
+# debug:   every body traces its calls to std::cout
+# release: no tracing and no <iostream>; trivial constructors and destructors
+#          are defaulted or inlined, and functions that cannot throw and
+#          cannot be overridden are noexcept
+PROFILES = ('debug', 'release')
+
+
+def nothrow(fn):
+    # Release bodies are empty or `return {};`, which can only throw when
+    # value-initializing a class type does.
+    t = fn.return_type
+    return t is None or isinstance(t, (Primitive, Pointer))
+
+
+def overridable(cls, fn):
+    # noexcept on a virtual binds every overrider, hand-written ones too,
+    # whatever the generated stub does. Run after devirtualize, which decides
+    # what is still virtual and which classes are final.
+    return virt_spec(fn, cls) is not None and not cls.final
+
+
+def release_method(cls, fn):
+    fn.trace = False
+    if isinstance(fn, Destructor):
+        fn.defaulted = True
+    elif isinstance(fn, Constructor):
+        if fn.args:
+            return
+        if cls.members:
+            fn.inline = True
+        else:
+            fn.defaulted = True
+    else:
+        fn.noexcept = nothrow(fn) and not overridable(cls, fn)
+
+
+def release(ent):
+    ent.deps.pop(IOSTREAMS.type, None)
+    if isinstance(ent, Class):
+        # Models share methods between classes, but what is noexcept, inline
+        # or defaulted depends on the class; annotate copies.
+        ent.methods = [copy.copy(fn) for fn in ent.methods]
+        for fn in ent.methods:
+            release_method(ent, fn)
+    elif isinstance(ent, Module):
+        for e in ent.ents:
+            if isinstance(e, Function):
+                e.trace = False
+                e.noexcept = nothrow(e)
+            elif isinstance(e, Class):
+                release(e)
+
+
+def apply_profile(graph, profile):
+    if profile == 'release':
+        for name, (ns, ent) in graph.entities.items():
+            release(ent)
@@ -0,0 +1,410 @@
+import collections
+import concurrent.futures
+import itertools
+import pickle
+import threading
+import time
+
+from . import model
+from .naming import ensure_list, gen_filename, guard_token, qualname
+
+
+class RenderCache:
+    # Bounded LRU of rendered line tuples, so that declarations shared by
+    # many classes are only formatted once.
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, make):
+        with self.lock:
+            lines = self.entries.get(key)
+            if lines is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return lines
+            self.misses += 1
+        lines = tuple(make())
+        with self.lock:
+            self.entries[key] = lines
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return lines
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+render_cache = RenderCache()
+
+
+def include_guard(children):
+    children = ensure_list(children)
+
+    def _include_guard(ns, cls, suffix):
+        _inc_guard = guard_token(ns, cls.name, suffix)
+        yield f"#ifndef { _inc_guard }"
+        yield f"#define { _inc_guard }"
+        yield ""
+        for child in children:
+            yield from child(ns, cls, suffix)
+        yield f"#endif // { _inc_guard }"
+        yield ""
+
+    return _include_guard
+
+
+def namespace(children=None):
+    children = ensure_list(children)
+
+    def _namespace(ns, cls, suffix):
+        _ns = '::'.join(ns)
+        yield f"nanespace { _ns }"
+        yield "{"
+        for child in children:
+            yield from child(ns, cls, suffix)
+        yield f"}} // namespace { _ns }"
+        yield ""
+
+    return _namespace
+
+
+def class_fwd_decl(child=None):
+    def _class_fwd_decl(ns, cls, suffix):
+        yield from cls.fwd_decl(ns)
+        if child:
+            yield from child(ns, cls, suffix)
+
+    return _class_fwd_decl
+
+
+def gen_doc(indent, cls=None, func=None):
+    yield f"{ indent }/** Brief description."
+    yield f"{ indent }  *"
+    yield f"{ indent }  * Detailed description."
+    if func and func.args:
+        yield f"{ indent }  *"
+        for arg in func.args:
+            yield f"{ indent }  * @param { arg.name } Description."
+    if func and func.return_type:
+        yield f"{ indent }  *"
+        yield f"{ indent }  * @return { func.return_type.fmt() } Description."
+    yield f"{ indent }  */"
+
+def fun_name(fn, cls=None):
+    if not cls:
+        return fn.name
+    else:
+        if isinstance(fn, model.Constructor):
+            fn_name = cls.name
+        elif isinstance(fn, model.Destructor):
+            fn_name = f"~{ cls.name }"
+        else:
+            fn_name = fn.name
+        return fn_name
+
+def virt_spec(fn, cls=None):
+    if not isinstance(fn, model.Method):
+        return None
+    if cls is not None:
+        sig = fn.signature()
+        if sig in cls.overrides:
+            return "override"
+        if sig in cls.sealed:
+            return None
+    # A pure specifier needs a virtual function.
+    return "virtual" if fn.virtual or fn.abstract else None
+
+
+def fun_quals(fn, decl=True, cls=None):
+    quals = []
+    if getattr(fn, 'const', False):
+        quals.append("const")
+    if fn.noexcept:
+        quals.append("noexcept")
+    if decl:
+        if virt_spec(fn, cls) == "override":
+            quals.append("override")
+        if fn.abstract:
+            quals.append("= 0")
+        elif getattr(fn, 'defaulted', False):
+            quals.append("= default")
+    return quals
+
+
+def initializers(cls):
+    return itertools.chain(
+        (f"{ b.cls }()" for b in cls.bases),
+        (f"{ m.name }({ 'nullptr' if isinstance(m.type, model.Pointer) else '' })" for m in cls.members )
+    )
+
+
+def fun_body(ns, fn, cls=None):
+    indent = " "*4
+    if fn.trace:
+        yield f'{ indent }std::cout << "{ fun_def_debug(ns, fn, cls) }" << std::endl;'
+    elif fn.return_type and fn.return_type != model.void:
+        yield f"{ indent }return {{}};"
+
+
+def gen_fun_decl(fn, indent=None, i_mul=1, cls=None):
+    if indent is None:
+        indent = " "*4
+    key = ('decl', fn.key(), fun_name(fn, cls), virt_spec(fn, cls), indent, i_mul)
+    if getattr(fn, 'inline', False):
+        key += (tuple(cls.bases), tuple((m.type, m.name) for m in cls.members))
+    yield from render_cache.get(key, lambda: _gen_fun_decl(fn, indent, i_mul, cls))
+
+
+def _gen_fun_decl(fn, indent, i_mul, cls):
+    yield from gen_doc(indent*i_mul, func=fn)
+    if virt_spec(fn, cls) == "virtual":
+        yield f"{ indent*i_mul }virtual"
+    if fn.return_type:
+        yield f"{ indent*i_mul }{ fn.return_type.fmt() }"
+    quals = fun_quals(fn, cls=cls)
+    inline = getattr(fn, 'inline', False)
+    closing = ")" if quals or inline else ");"
+    yield f"{ indent*i_mul }{ fun_name(fn, cls) }(" + ("" if fn.args else closing)
+    if fn.args:
+        for i, arg in enumerate(fn.args):
+            yield f"{ indent*(i_mul+1) }{ arg.type.fmt() } { arg.name }" + ("" if i == (len(fn.args) - 1) else ",")
+        yield f"{ indent*i_mul }{ closing }"
+    if inline:
+        # Only trivial constructors are inlined: initializers, empty body.
+        if quals:
+            yield f"{ indent*i_mul }{ ' '.join(quals) }"
+        for i, init in enumerate(initializers(cls)):
+            yield f"{ indent*(i_mul+1) }{ ':' if i == 0 else ',' } { init }"
+        yield f"{ indent*i_mul }{{}}"
+    elif quals:
+        yield f"{ indent*i_mul }{ ' '.join(quals) };"
+
+
+def include_self(children=None):
+    children = ensure_list(children)
+
+    def _include_self(ns, mod, suffix):
+        yield f'#include "{ gen_filename(None, ns, mod.name, ".hpp") }"'
+        yield ""
+
+        for child in children:
+            yield from child(ns, mod, suffix)
+
+    return _include_self
+
+
+def class_decl(child=None):
+    def _class_decl(ns, cls, suffix):
+        indent = ' '*4
+        yield from gen_doc(indent)
+        yield f"{ indent }class { cls.name }" + (" final" if cls.final else "")
+        if cls.bases:
+            yield f"{ indent*2 }: public { cls.bases[0].fmt() }"
+            for base in cls.bases[1:]:
+                yield f"{ indent*2 }, public { base.fmt() }"
+        yield f"{ indent }{{"
+        if cls.methods:
+            yield f"{ indent }public:"
+            for method in cls.methods:
+                yield from gen_fun_decl(method, indent=indent, i_mul=2, cls=cls)
+        if cls.members:
+            yield f"{ indent }public:"
+            for member in cls.members:
+                yield f"{ indent*2 }/** A variable."
+                yield f"{ indent*2 }  *"
+                yield f"{ indent*2 }  * Details."
+                yield f"{ indent*2 }  */"
+                yield f"{ indent*2 }{ member.type.fmt() } { member.name };"
+        yield f"{ indent }}}; // class { cls.name }"
+        if cls.size is not None:
+            yield from size_guard(ns, cls, indent)
+        if child:
+            yield from child(ns, cls, suffix)
+
+    return _class_decl
+
+
+def size_guard(ns, cls, indent):
+    # Sizes are computed for LP64 targets; elsewhere the guard is moot.
+    yield f"{ indent }static_assert(sizeof(void *) != 8 || sizeof({ cls.name }) == { cls.size },"
+    yield f'{ indent }              "layout of { qualname(ns, cls.name) } changed");'
+
+
+def module_decl(children=None):
+    children = ensure_list(children)
+
+    def _module_decl(ns, mod, suffix):
+        yield from mod.decl(ns)
+
+        for child in children:
+            yield from child(ns, mod, suffix)
+    return _module_decl
+
+
+def include_dep(dep, suffix):
+    if isinstance(dep, model.Primitive):
+        return
+
+    if suffix.startswith('_fwd'):
+        return
+    if suffix.endswith('.hpp'):
+
+        inc = dep.as_header_include()
+        if inc:
+            yield inc
+    else:
+        inc = dep.as_src_include()
+        if inc:
+            yield inc
+
+
+def include_deps(children=None):
+    children = ensure_list(children)
+
+    def _include_deps(ns, cls, suffix):
+        if cls:
+            for dep in cls.deps.values():
+                yield from include_dep(dep, suffix)
+        yield ""
+
+        for child in children:
+            yield from child(ns, cls, suffix)
+
+    return _include_deps
+
+
+def fun_def_debug(ns, fn, cls=None):
+    if cls:
+        if isinstance(fn, model.Constructor):
+            return f"{ '::'.join(ns) }::{ cls.name } created."
+        elif isinstance(fn, model.Destructor):
+            return f"{ '::'.join(ns) }::{ cls.name } destroyed."
+
+    return f"{ '::'.join(ns) }::{ fn.name } called."
+
+
+def class_def(children=None):
+    children = ensure_list(children)
+
+    def _class_def(ns, cls, suffix):
+        if cls:
+            for fn in cls.methods:
+                if fn.defaulted or fn.inline:
+                    continue
+                key = ('def', tuple(ns), cls.name, fn.key(), virt_spec(fn, cls))
+                if isinstance(fn, model.Constructor):
+                    key += (tuple(cls.bases), tuple((m.type, m.name) for m in cls.members))
+                yield from render_cache.get(key, lambda: method_def(ns, fn, cls))
+
+        for child in children:
+            yield from child(ns, cls, suffix)
+    return _class_def
+
+
+def method_def(ns, fn, cls):
+    indent = " "*4
+    spec = virt_spec(fn, cls)
+    if spec:
+        yield f"/* { spec } */"
+    if fn.return_type:
+        yield f"{ fn.return_type.fmt() }"
+    yield f"{ cls.name }::{ fun_name(fn, cls) }(" + ("" if fn.args else ")")
+    if fn.args:
+        for i, arg in enumerate(fn.args):
+            yield f"{ indent }{ arg.type.fmt() } { arg.name }" + ("" if i == (len(fn.args) - 1) else ",")
+        yield ")"
+    quals = fun_quals(fn, decl=False)
+    if quals:
+        yield ' '.join(quals)
+    if isinstance(fn, model.Constructor):
+        for i, init in enumerate(initializers(cls)):
+            yield f"{ indent }{ ':' if i == 0 else ',' } { init }"
+
+    yield "{"
+    yield from fun_body(ns, fn, cls)
+    yield f"}} // method { cls.name }::{ fun_name(fn, cls) }"
+    yield ""
+
+
+def module_def(children=None):
+    children = ensure_list(children)
+
+    def _module_def(ns, mod, suffix):
+        yield from mod.src_def(ns)
+
+        for child in children:
+            yield from child(ns, mod, suffix)
+
+    return _module_def
+
+
+header_fwd = include_guard(namespace(class_fwd_decl()))
+header = include_guard([
+    include_deps(),
+    namespace(
+        #class_decl()
+        module_decl()
+    )
+    ])
+#header_fwd = include_guard(class_fwd_decl())
+source = include_self([
+    include_deps(),
+    namespace(
+        #class_def()
+        module_def()
+    )
+    ])
+
+
+PIPELINES = {
+    '_fwd.hpp': header_fwd,
+    '.hpp': header,
+    '.cpp': source,
+}
+
+
+BACKENDS = ('combinators', 'jinja')
+
+# First line of every generated file; kxgen only overwrites files that
+# start with it.
+MARKER = "// Generated by kxgen; do not edit."
+
+
+def join_lines(lines):
+    return ''.join(f"{ line }\n" for line in lines)
+
+
+def render(ns, obj, suffix, backend='combinators'):
+    if backend == 'jinja':
+        from . import jinja_backend
+        return f"{ MARKER }\n{ jinja_backend.render(ns, obj, suffix) }"
+    return join_lines([MARKER, *PIPELINES[suffix](ns, obj, suffix)])
+
+
+def render_task(task):
+    start = time.perf_counter()
+    data = render(*task)
+    return data, time.perf_counter() - start
+
+
+def render_all(tasks, jobs):
+    # Results come back in task order whichever pool is used, so output is
+    # deterministic.  Fall back to threads where processes are unavailable or
+    # the model cannot be pickled, which pickle mostly reports as TypeError
+    # or AttributeError; a render error of those types just raises again
+    # from the threads.
+    chunksize = max(1, len(tasks) // (jobs * 4))
+    try:
+        with concurrent.futures.ProcessPoolExecutor(jobs) as pool:
+            return list(pool.map(render_task, tasks, chunksize=chunksize))
+    except (OSError, NotImplementedError, TypeError, AttributeError, pickle.PicklingError,
+            concurrent.futures.process.BrokenProcessPool):
+        with concurrent.futures.ThreadPoolExecutor(jobs) as pool:
+            return list(pool.map(render_task, tasks))
@@ -0,0 +1,251 @@
+import os
+
+from .model import Class, Function, HardDep, Module, Std, Type, TypeDef, builtin
+from .naming import gen_filename, qualname
+
+
+# Checks a model before anything is rendered: every referenced type must be
+# generated or have a hand-written header, bases must be classes, no class
+# may derive from itself, no two entities may generate the same files, and
+# headers must not include each other in a cycle. Everything is linear in the
+# size of the model.
+
+
+def references(ent, prefix=''):
+    # (type, is base, where) for every type the entity refers to.
+    if isinstance(ent, Function):
+        if ent.return_type is not None:
+            yield ent.return_type, False, f"{ prefix }{ ent.name }: return type"
+        for a in ent.args:
+            yield a.type, False, f"{ prefix }{ ent.name }: argument { a.name }"
+    elif isinstance(ent, TypeDef):
+        yield ent.type, False, f"typedef { ent.name }"
+    elif isinstance(ent, Class):
+        for m in ent.methods:
+            yield from references(m, f"{ ent.name }::")
+        for m in ent.members:
+            yield m.type, False, f"{ ent.name }: member { m.name }"
+        for b in ent.bases:
+            yield b, True, f"{ ent.name }: base"
+    elif isinstance(ent, Module):
+        for e in ent.ents:
+            yield from references(e)
+
+
+def types(ent):
+    # Same as references(), minus the descriptions, for the fast pass.
+    if isinstance(ent, Module):
+        for e in ent.ents:
+            yield from types(e)
+        return
+    if isinstance(ent, Class):
+        fns = ent.methods
+        for m in ent.members:
+            yield m.type, False
+        for b in ent.bases:
+            yield b, True
+    elif isinstance(ent, Function):
+        fns = (ent,)
+    else:
+        yield ent.type, False
+        return
+    for fn in fns:
+        if fn.return_type is not None:
+            yield fn.return_type, False
+        for a in fn.args:
+            yield a.type, False
+
+
+class Validator:
+    def __init__(self, graph, include_dirs=()):
+        self.graph = graph
+        self.include_dirs = include_dirs
+        self.namespaces = set()
+        for ns, ent in graph.entities.values():
+            for i in range(1, len(ns) + 1):
+                self.namespaces.add(tuple(ns[:i]))
+        self.headers = {}
+        # Verdicts per (interned) type; ids hash much faster than Types.
+        self.checked = {}
+
+    def hand_written(self, type_):
+        header = gen_filename(None, type_.ns, type_.cls, '.hpp')
+        if header not in self.headers:
+            self.headers[header] = any(
+                os.path.exists(os.path.join(d, header)) for d in self.include_dirs
+            )
+        return self.headers[header]
+
+    def check_type(self, type_, base=False):
+        if isinstance(type_, Std) or builtin(type_):
+            return None
+        spelled = qualname(type_.ns, type_.cls)
+        if self.graph.resolve(type_) is None:
+            if self.hand_written(type_):
+                return None
+            if type_.ns in self.namespaces:
+                return f"unknown type { spelled }: { '::'.join(type_.ns) } has no such class or typedef"
+            return f"unknown type { spelled }: neither generated nor found as { gen_filename(None, type_.ns, type_.cls, '.hpp') }"
+        if base and self.graph.class_of(type_) is None:
+            return f"{ spelled } is not a class"
+        return None
+
+    def suspect(self):
+        # Types are interned, so checking every type in existence is cheap and
+        # clears the common case without walking the model. Bases need their
+        # own check, since a valid type may still not be a class.
+        return any(
+            self.check_type(t) for t in list(Type.registry.values())
+        ) or any(
+            self.check_type(b, base=True)
+            for cls in self.graph.classes.values() for b in cls.bases
+        )
+
+    def references(self):
+        # Every distinct type is checked once; only entities with a broken
+        # reference are walked again to say where it is.
+        if not self.suspect():
+            return
+        checked = self.checked
+        for name, (ns, ent) in self.graph.entities.items():
+            broken = False
+            for type_, base in types(ent):
+                key = (id(type_), base)
+                error = checked.get(key, checked)
+                if error is checked:
+                    error = checked[key] = self.check_type(type_, base)
+                if error:
+                    broken = True
+            if broken:
+                for type_, base, where in references(ent):
+                    error = checked[(id(type_), base)]
+                    if error:
+                        yield f"{ '::'.join(ns) }::{ where }: { error }"
+
+    def clashes(self):
+        for name, other, header in self.graph.clashes:
+            yield f"{ name }: generates { header }, as does { other }"
+
+    def cycles(self):
+        # Tarjan's strongly connected components over full-header includes,
+        # iteratively, so deep models do not hit the recursion limit.
+        edges = {}
+        targets = {}
+        hard = HardDep.rank
+        for name, (ns, ent) in self.graph.entities.items():
+            out = []
+            for dep in ent.deps.values():
+                if dep.rank == hard:
+                    key = id(dep.type)
+                    target = targets.get(key, targets)
+                    if target is targets:
+                        target = targets[key] = self.graph.resolve(dep.type)
+                    if target is not None and target != name:
+                        out.append((target, dep.type))
+            edges[name] = out
+
+        index = {}
+        low = {}
+        stack = []
+        on_stack = set()
+        counter = 0
+        for root in edges:
+            if root in index:
+                continue
+            work = [(root, 0)]
+            while work:
+                node, i = work.pop()
+                if i == 0:
+                    index[node] = low[node] = counter
+                    counter += 1
+                    stack.append(node)
+                    on_stack.add(node)
+                out = edges[node]
+                while i < len(out):
+                    succ = out[i][0]
+                    i += 1
+                    if succ not in index:
+                        work.append((node, i))
+                        work.append((succ, 0))
+                        break
+                    if succ in on_stack:
+                        low[node] = min(low[node], index[succ])
+                else:
+                    if low[node] == index[node]:
+                        scc = []
+                        while True:
+                            n = stack.pop()
+                            on_stack.discard(n)
+                            scc.append(n)
+                            if n == node:
+                                break
+                        if len(scc) > 1:
+                            yield self.describe(scc, edges)
+                    if work:
+                        parent = work[-1][0]
+                        low[parent] = min(low[parent], low[node])
+
+    def base_cycles(self):
+        # Depth-first over the generated bases of every class. Cycles through
+        # several entities are include cycles too and reported as such; this
+        # catches a class deriving from itself or from a class in its own
+        # module, which devirtualize and layout planning rely on not happening.
+        names = {id(cls): qualname(t.ns, t.cls) for t, cls in self.graph.classes.items()}
+        owner = {id(cls): self.graph.symbols[t] for t, cls in self.graph.classes.items()}
+        done = set()
+        for root in self.graph.classes.values():
+            if id(root) in done:
+                continue
+            work = [(root, iter(root.bases))]
+            depth = {id(root): 0}
+            while work:
+                cls, bases = work[-1]
+                for b in bases:
+                    base = self.graph.class_of(b)
+                    if base is None or id(base) in done:
+                        continue
+                    if id(base) in depth:
+                        path = [c for c, _ in work[depth[id(base)]:]] + [base]
+                        if len({owner[id(c)] for c in path}) == 1:
+                            yield f"base cycle: { ' -> '.join(names[id(c)] for c in path) }"
+                        continue
+                    depth[id(base)] = len(work)
+                    work.append((base, iter(base.bases)))
+                    break
+                else:
+                    work.pop()
+                    del depth[id(cls)]
+                    done.add(id(cls))
+
+    def describe(self, scc, edges):
+        # One concrete cycle through the component, found by walking edges
+        # that stay inside it until a node repeats.
+        members = set(scc)
+        path = [min(scc)]
+        seen = {path[0]: 0}
+        via = []
+        while True:
+            target, type_ = min((e for e in edges[path[-1]] if e[0] in members), key=lambda e: e[0])
+            via.append(type_)
+            if target in seen:
+                start = seen[target]
+                path = path[start:] + [target]
+                via = via[start:]
+                break
+            seen[target] = len(path)
+            path.append(target)
+        steps = ' -> '.join(
+            f"{ a } (needs { t.fmt() })" for a, t in zip(path, via)
+        )
+        return f"include cycle: { steps } -> { path[-1] }"
+
+    def run(self):
+        errors = list(self.clashes())
+        errors.extend(self.references())
+        errors.extend(self.base_cycles())
+        errors.extend(self.cycles())
+        return errors
+
+
+def validate(graph, configs):
+    return Validator(graph, [c['include_dir'] for c in configs]).run()
@@ -0,0 +1,144 @@
+import importlib
+import os
+import time
+
+from .devirt import devirtualize, state as devirt_state
+from .graph import DepGraph
+from .includes import minimize_includes
+from .layout import LayoutPlanner
+from .instrument import log, stats
+from .loader import load_model
+from .output import FileWriter, IncrementalEmitter, canonical
+from .profile import apply_profile
+from .validate import validate
+
+
+class Watcher:
+    # Keeps the model and its dependency graph in memory and, whenever a
+    # model source changes, regenerates only the entities that changed and
+    # their dependents.
+    def __init__(self, model_path, manifest, backend='combinators', interval=0.2, minimize=True,
+                 profile='debug', devirt=True, pack=False, cache=None, force=False):
+        self.model_path = model_path
+        self.manifest = manifest
+        self.backend = backend
+        self.interval = interval
+        self.minimize = minimize
+        self.profile = profile
+        self.devirt = devirt
+        self.pack = pack
+        self.cache = cache
+        self.force = force
+        self.memo = {}
+        self.graph = None
+        # devirt_state() of every entity as of the last update; the loader
+        # reuses unchanged entities, so their previous state is gone by then.
+        self.devirt_states = {}
+        if model_path:
+            self.paths = [model_path]
+        else:
+            from . import configs
+            self.paths = [configs.__file__]
+
+    def load(self):
+        if self.model_path:
+            return load_model(self.model_path, memo=self.memo)
+        from . import configs
+        if self.graph is not None:
+            importlib.reload(configs)
+        return configs.configs
+
+    def stamp(self):
+        stamp = []
+        for path in self.paths:
+            try:
+                st = os.stat(path)
+                stamp.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                stamp.append(None)
+        return stamp
+
+    def changed(self, graph):
+        if self.graph is None:
+            return set(graph.entities)
+        changed = set()
+        for name, (ns, ent) in graph.entities.items():
+            prev = self.graph.entities.get(name)
+            if prev is None or self.graph.dirs[name] != graph.dirs[name]:
+                changed.add(name)
+            elif prev[1] is not ent and canonical([prev[0], prev[1]]) != canonical([ns, ent]):
+                changed.add(name)
+        return changed
+
+    def update(self):
+        start = time.perf_counter()
+        with stats.timer('model'):
+            model = self.load()
+        with stats.timer('deps'):
+            graph = DepGraph.build(model)
+        if self.minimize:
+            with stats.timer('includes'):
+                minimize_includes(graph)
+        with stats.timer('validate'):
+            errors = validate(graph, model)
+        if errors:
+            for error in errors:
+                log.error("%s", error)
+            # Keep the last good graph, so the fix is diffed against it.
+            return
+        if self.devirt:
+            devirtualize(graph)
+        if self.pack:
+            LayoutPlanner(graph, pack=True).plan()
+        apply_profile(graph, self.profile)
+        changed = self.changed(graph)
+        states = {name: devirt_state(ent) for name, (ns, ent) in graph.entities.items()}
+        if self.graph is not None:
+            # Bases whose subclasses were added or removed.
+            changed.update(
+                name for name, s in states.items() if self.devirt_states.get(name, s) != s
+            )
+        names = graph.affected(changed)
+        if self.graph is not None:
+            for name in sorted(set(self.graph.entities) - set(graph.entities)):
+                log.warning("%s was removed; its generated files are left in place", name)
+        self.graph = graph
+        self.devirt_states = states
+
+        emitter = IncrementalEmitter(self.manifest, self.backend, autosave=False,
+                                     writer=FileWriter(atomic=True, force=self.force), cache=self.cache)
+        with stats.timer('generate'):
+            for name in sorted(names):
+                ns, ent = graph.entities[name]
+                inc_dir, src_dir = graph.dirs[name]
+                ent.gen(ns, inc_dir=inc_dir, src_dir=src_dir, emitter=emitter)
+            emitter.close()
+        log.info("regenerated %d entities (%d files written) in %.1f ms",
+                    len(names), emitter.written, (time.perf_counter() - start) * 1e3)
+
+    def run(self, cycles=None):
+        stamp = self.stamp()
+        self.try_update()
+        log.info("watching %s", ', '.join(self.paths))
+        try:
+            while cycles is None or cycles > 0:
+                time.sleep(self.interval)
+                new = self.stamp()
+                if new == stamp:
+                    continue
+                stamp = new
+                if cycles is not None:
+                    cycles -= 1
+                self.try_update()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.manifest.save()
+
+    def try_update(self):
+        try:
+            self.update()
+        except Exception as e:
+            # Keep watching, also when the model is broken from the start;
+            # the next edit will probably fix it.
+            log.error("%s", e)